@@ -0,0 +1,95 @@
+"""The fixtures and timers shared by the benchmarks."""
+
+import sys
+import timeit
+import typing as tp
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src" / "server"))
+
+from components.block import Block  # noqa: E402
+from components.transaction import Transaction  # noqa: E402
+from components.wallet import Wallet  # noqa: E402
+
+
+def timings(
+    function: tp.Callable[[], tp.Any], repeat: int
+) -> tp.Tuple[int, tp.List[float]]:
+    """
+    Return the number of calls every run is made of, along with the seconds a single
+    call took in each of `repeat` runs.
+    """
+    timer = timeit.Timer(function)
+    number, _ = timer.autorange()
+
+    return number, [elapsed / number for elapsed in timer.repeat(repeat, number)]
+
+
+def measure(function: tp.Callable[[], tp.Any], repeat: int) -> float:
+    """Return the fastest time of a single call, in milliseconds."""
+    _, runs = timings(function, repeat)
+
+    return min(runs) * 1000
+
+
+def transfer(
+    sender: Wallet,
+    recipient: Wallet,
+    inputs: tp.List[str],
+    amount: int = 1,
+    change: int = 99,
+) -> Transaction:
+    """Sign a transfer of `amount` coins, crediting its outputs as a node would."""
+    transaction = Transaction.create_transaction(
+        sender.public_key,
+        recipient.public_key,
+        amount,
+        inputs,
+        [],
+        sender.private_key,
+    )
+    transaction.transaction_outputs = [
+        (f"{transaction.id}:0", transaction.id, recipient.public_key, amount),
+        (f"{transaction.id}:1", transaction.id, sender.public_key, change),
+    ]
+
+    return transaction
+
+
+def block(index: int, previous_hash: str, transactions: tp.List[Transaction]) -> Block:
+    # The validator does not check the difficulty, so blocks are left unmined
+    block = Block(
+        index=index,
+        timestamp=datetime.utcnow(),
+        nonce=0,
+        previous_hash=previous_hash,
+        transactions=transactions,
+    )
+    block.merkle_root = Block.merkle_tree(transactions).root()
+    block.current_hash = Block.calculate_hash(block)
+
+    return block
+
+
+def chain(wallets: tp.List[Wallet], n_blocks: int, capacity: int) -> tp.List[Block]:
+    """
+    Return a chain of transfers between a few wallets. Distinct inputs give every
+    transaction an id and a signature of its own.
+    """
+    blocks: tp.List[Block] = []
+    for index in range(n_blocks):
+        transactions = [
+            transfer(
+                wallets[(index + position) % len(wallets)],
+                wallets[(index + position + 1) % len(wallets)],
+                [f"{index}:{position}"],
+            )
+            for position in range(capacity)
+        ]
+
+        blocks.append(
+            block(index, blocks[-1].current_hash if blocks else "1", transactions)
+        )
+
+    return blocks
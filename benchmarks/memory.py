@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+
+"""Compare the memory held by the chain and its outputs before and after packing."""
+
+import sys
+import tracemalloc
+import typing as tp
+from pathlib import Path
+
+import click
+from rich.console import Console
+from rich.table import Table
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src" / "server"))
+
+import common  # noqa: E402
+from components import crypto  # noqa: E402
+from components.address import REGISTRY  # noqa: E402
+from components.block import Block  # noqa: E402
+from components.store import PackedBlocks  # noqa: E402
+from components.utxo import Output  # noqa: E402
+from components.wallet import Wallet  # noqa: E402
+
+console = Console()
+
+
+def allocated(build: tp.Callable[[], tp.Any]) -> int:
+    """Return the number of bytes still allocated by `build` once it returns."""
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        result = build()  # noqa: F841
+        after, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return after - before
+
+
+@click.command()
+@click.option("--blocks", type=int, default=1000, show_default=True)
+@click.option("--capacity", type=int, default=5, show_default=True)
+@click.option("--wallets", type=int, default=10, show_default=True)
+@click.option(
+    "-s",
+    "--scheme",
+    type=click.Choice(sorted(crypto.SCHEMES)),
+    default="rsa",
+    show_default=True,
+)
+def main(blocks: int, capacity: int, wallets: int, scheme: str):
+    crypto.use_scheme(scheme)
+
+    with console.status("Generating the chain"):
+        encodings = [
+            block.to_bytes()
+            for block in common.chain(
+                [Wallet.generate_wallet() for _ in range(wallets)], blocks, capacity
+            )
+        ]
+
+    def outputs(record: tp.Callable[[tp.Any], tp.Any]) -> tp.Dict[str, tp.Any]:
+        # Blocks arrive over the wire, so that none of them share their strings
+        return {
+            utxo[0]: record(utxo)
+            for data in encodings
+            for transaction in Block.from_bytes(data).transactions
+            for utxo in transaction.transaction_outputs
+        }
+
+    cases = {
+        "Blocks": (
+            lambda: [Block.from_bytes(data) for data in encodings],
+            lambda: PackedBlocks(Block.from_bytes(data) for data in encodings),
+        ),
+        "Outputs": (
+            lambda: outputs(lambda utxo: tuple(utxo)),
+            lambda: outputs(lambda utxo: Output.from_utxo(utxo, REGISTRY)),
+        ),
+    }
+
+    n_transactions = blocks * capacity
+
+    table = Table(
+        "Data",
+        "Before (bytes/block)",
+        "After (bytes/block)",
+        "Before (bytes/tx)",
+        "After (bytes/tx)",
+        "Saved",
+    )
+    for name, (before, after) in cases.items():
+        with console.status(f"Measuring the {name.lower()}"):
+            old, new = allocated(before), allocated(after)
+
+        table.add_row(
+            name,
+            f"{old / blocks:.0f}",
+            f"{new / blocks:.0f}",
+            f"{old / n_transactions:.0f}",
+            f"{new / n_transactions:.0f}",
+            f"{1 - new / old:.0%}",
+        )
+
+    console.print(table)
+
+
+if __name__ == "__main__":
+    main()
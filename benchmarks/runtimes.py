@@ -0,0 +1,278 @@
+#!/usr/bin/env python
+
+"""Compare the threaded runtime of a node against the one built on an event loop."""
+
+import asyncio
+import json
+import logging
+import os
+import socket
+import statistics
+import sys
+import threading
+import time
+import typing as tp
+from pathlib import Path
+
+import click
+import waitress
+from aiohttp import web
+from rich.console import Console
+from rich.table import Table
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src" / "server"))
+
+from components.node import Node  # noqa: E402
+from components.wallet import Wallet  # noqa: E402
+from core import aio, http  # noqa: E402
+from core.cli import integers  # noqa: E402
+from loguru import logger  # noqa: E402
+from main import build_app  # noqa: E402
+
+HOST = "127.0.0.1"
+
+console = Console()
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind((HOST, 0))
+
+        return s.getsockname()[1]
+
+
+def slow_peer(delay: float) -> str:
+    """Listen for requests that are answered only after `delay` seconds."""
+
+    async def handle(request: web.Request) -> web.Response:
+        await request.read()
+        await asyncio.sleep(delay)
+
+        return web.Response(text="ok")
+
+    application = web.Application()
+    application.router.add_route("*", "/{path:.*}", handle)
+
+    port = free_port()
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+
+    runner = web.AppRunner(application, access_log=None)
+    loop.run_until_complete(runner.setup())
+    loop.run_until_complete(web.TCPSite(runner, HOST, port, backlog=4096).start())
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+
+    return f"http://{HOST}:{port}"
+
+
+def node_server(runtime: str) -> str:
+    """Serve the API of an offline node with the given runtime."""
+    app = build_app()
+    app.node = Node(ip=HOST, port=0, capacity=1, difficulty=1, n_nodes=2)
+    app.node.wallet = Wallet.generate_wallet()
+
+    port = free_port()
+    if runtime == "async":
+        target, kwargs = aio.serve, {"app": app, "host": HOST, "port": port}
+    else:
+        target = waitress.serve
+        kwargs = {"app": app, "host": HOST, "port": port, "threads": 10}
+
+    threading.Thread(target=target, kwargs=kwargs, daemon=True).start()
+
+    # Wait for the server to accept connections
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection((HOST, port), timeout=1).close()
+            break
+        except OSError:
+            time.sleep(0.05)
+
+    return f"http://{HOST}:{port}"
+
+
+def transport(runtime: str, concurrency: int) -> http.Transport:
+    if runtime == "async":
+        return aio.AsyncTransport(max_connections=concurrency)
+
+    return http.Transport()
+
+
+def fan_out(runtime: str, peer: str, n_requests: int) -> tp.Dict[str, tp.Any]:
+    """Broadcast a payload to as many slow peers as there are requests."""
+    http.use_transport(transport(runtime, n_requests))
+
+    start = time.perf_counter()
+    responses = http.broadcast([f"{peer}/{i}" for i in range(n_requests)], {})
+    elapsed = time.perf_counter() - start
+
+    return {
+        "elapsed": elapsed,
+        "errors": sum(response is None for response in responses),
+    }
+
+
+def closed_loop(
+    client: http.Transport, url: str, concurrency: int, n_requests: int
+) -> tp.Dict[str, tp.Any]:
+    """Keep `concurrency` requests in flight, issuing a new one as soon as one ends."""
+    lock = threading.Lock()
+    done = threading.Event()
+    latencies: tp.List[float] = []
+    state = {"issued": 0, "errors": 0}
+
+    def issue() -> None:
+        with lock:
+            if state["issued"] == n_requests:
+                return
+
+            state["issued"] += 1
+
+        start = time.perf_counter()
+        future = client.submit("GET", url, {"Accept": "application/json"})
+        future.add_done_callback(lambda future: finish(future, start))
+
+    def finish(future, start: float) -> None:
+        with lock:
+            if future.exception() is not None or future.result().status_code != 200:
+                state["errors"] += 1
+            else:
+                latencies.append(time.perf_counter() - start)
+
+            if len(latencies) + state["errors"] == n_requests:
+                done.set()
+
+        issue()
+
+    start = time.perf_counter()
+    for _ in range(concurrency):
+        issue()
+
+    done.wait()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+
+    return {
+        "elapsed": elapsed,
+        "errors": state["errors"],
+        "throughput": len(latencies) / elapsed,
+        "p50": statistics.median(latencies) if latencies else 0.0,
+        "p99": latencies[int(0.99 * (len(latencies) - 1))] if latencies else 0.0,
+    }
+
+
+@click.command()
+@click.option(
+    "-c",
+    "--concurrency",
+    default="10,100,500",
+    show_default=True,
+    callback=integers,
+    help="The comma-separated numbers of requests kept in flight against a node",
+)
+@click.option(
+    "-n",
+    "--requests",
+    "n_requests",
+    type=int,
+    default=2000,
+    show_default=True,
+    help="The number of requests sent to a node at every concurrency",
+)
+@click.option(
+    "-p",
+    "--peers",
+    type=int,
+    default=1000,
+    show_default=True,
+    help="The number of slow peers a payload is broadcast to",
+)
+@click.option(
+    "--delay",
+    type=float,
+    default=0.2,
+    show_default=True,
+    help="Seconds slow peers take to respond",
+)
+@click.option(
+    "-o",
+    "--output",
+    type=click.Path(dir_okay=False, writable=True, path_type=Path),
+    default=None,
+    help="A file to write the results to, as JSON",
+)
+def main(
+    concurrency: tp.List[int],
+    n_requests: int,
+    peers: int,
+    delay: float,
+    output: tp.Optional[Path],
+):
+    """
+    Serve the API of a node with either runtime under a growing number of concurrent
+    requests, and broadcast to a large number of slow peers with either transport.
+    """
+    logger.remove()
+
+    # Waitress warns about every request queued behind its busy threads
+    logging.getLogger("waitress").setLevel(logging.ERROR)
+
+    results: tp.Dict[str, tp.List[tp.Dict[str, tp.Any]]] = {"serve": [], "fan_out": []}
+
+    # The same client loads both servers, so that only the servers differ
+    for runtime in ("threaded", "async"):
+        url = f"{node_server(runtime)}/wallet/balance"
+        for n in concurrency:
+            with console.status(f"Loading the {runtime} server with {n} clients"):
+                client = aio.AsyncTransport(max_connections=n)
+                results["serve"].append(
+                    {
+                        "runtime": runtime,
+                        "concurrency": n,
+                        **closed_loop(client, url, n, n_requests),
+                    }
+                )
+                client.close()
+
+    peer = slow_peer(delay)
+    for runtime in ("threaded", "async"):
+        with console.status(f"Broadcasting to {peers} peers with the {runtime} one"):
+            results["fan_out"].append(
+                {"runtime": runtime, "peers": peers, **fan_out(runtime, peer, peers)}
+            )
+
+    table = Table("Runtime", "Clients", "Req/s", "p50 (ms)", "p99 (ms)", "Errors")
+    for result in results["serve"]:
+        table.add_row(
+            result["runtime"],
+            str(result["concurrency"]),
+            f"{result['throughput']:.0f}",
+            f"{result['p50'] * 1000:.1f}",
+            f"{result['p99'] * 1000:.1f}",
+            str(result["errors"]),
+        )
+    console.print(table)
+
+    table = Table("Runtime", "Peers", "Elapsed (s)", "Errors")
+    for result in results["fan_out"]:
+        table.add_row(
+            result["runtime"],
+            str(result["peers"]),
+            f"{result['elapsed']:.2f}",
+            str(result["errors"]),
+        )
+    console.print(table)
+
+    if output is not None:
+        output.write_text(json.dumps(results, indent=2))
+
+    # The servers and event loops run on threads that never finish
+    sys.stdout.flush()
+    os._exit(0)
+
+
+if __name__ == "__main__":
+    main()
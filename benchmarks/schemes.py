@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+
+"""Compare the key sizes and signing costs of the supported signature schemes."""
+
+import sys
+from pathlib import Path
+
+import click
+from rich.console import Console
+from rich.table import Table
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src" / "server"))
+
+import common  # noqa: E402
+from components import crypto  # noqa: E402
+from components import transaction as transaction_module  # noqa: E402
+from components.validator import ChainValidator  # noqa: E402
+from components.wallet import Wallet  # noqa: E402
+
+console = Console()
+
+
+@click.command()
+@click.option("--blocks", type=int, default=200, show_default=True)
+@click.option("--repeat", type=int, default=5, show_default=True)
+def main(blocks: int, repeat: int):
+    validator = ChainValidator()
+
+    table = Table(
+        "Scheme",
+        "Address (bytes)",
+        "Signature (bytes)",
+        "Transaction (bytes)",
+        "Keygen (ms)",
+        "Sign (ms)",
+        "Verify (ms)",
+        "Chain (tx/s)",
+    )
+    for name, scheme in crypto.SCHEMES.items():
+        with console.status(f"Benchmarking {name}"):
+            crypto.use_scheme(name)
+
+            sender, recipient = Wallet.generate_wallet(), Wallet.generate_wallet()
+            transaction = common.transfer(sender, recipient, [])
+
+            message = transaction.id.encode("utf-8")
+            signature = scheme.sign(sender.private_key, message)
+
+            sample = common.chain([sender, recipient], blocks, 1)
+
+            def validate() -> None:
+                # Peers validate chains they have not seen before
+                transaction_module._verify.cache_clear()
+
+                if not validator.validate(sample):
+                    raise RuntimeError("The benchmark chain failed to validate")
+
+            elapsed = common.measure(validate, repeat)
+
+            def sign() -> str:
+                return scheme.sign(sender.private_key, message)
+
+            def verify() -> bool:
+                return scheme.verify(sender.public_key, message, signature)
+
+            table.add_row(
+                name,
+                str(len(sender.public_key) // 2),
+                str(len(signature) // 2),
+                str(len(transaction.to_bytes())),
+                f"{common.measure(scheme.generate, 1):.3f}",
+                f"{common.measure(sign, repeat):.3f}",
+                f"{common.measure(verify, repeat):.3f}",
+                f"{(blocks - 1) / elapsed * 1000:.0f}",
+            )
+
+    console.print(table)
+
+
+if __name__ == "__main__":
+    main()
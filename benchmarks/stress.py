@@ -0,0 +1,263 @@
+#!/usr/bin/env python
+
+"""Hammer a node from many threads at once and check that its state stays consistent."""
+
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+import typing as tp
+from collections import Counter
+from pathlib import Path
+
+import click
+from rich.console import Console
+from rich.table import Table
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src" / "server"))
+
+import common  # noqa: E402
+from components.node import Node  # noqa: E402
+from components.transaction import Transaction  # noqa: E402
+from components.utxo import UTXOSet  # noqa: E402
+from components.wallet import Wallet  # noqa: E402
+from loguru import logger  # noqa: E402
+
+# The coins every wallet starts with
+FUNDS = 1000
+
+console = Console()
+
+
+def fund(node: Node, wallets: tp.List[Wallet]) -> None:
+    """Append a genesis block crediting every wallet, as the bootstrap node would."""
+    transactions = []
+    for wallet in wallets:
+        transaction = Transaction.create_transaction(
+            "0", wallet.public_key, FUNDS, [], [], wallets[0].private_key
+        )
+        transaction.transaction_outputs = [
+            (f"{transaction.id}:0", transaction.id, wallet.public_key, FUNDS),
+            (f"{transaction.id}:1", transaction.id, "0", 0),
+        ]
+        transactions.append(transaction)
+
+        node.update_wallets(transaction)
+
+    node.append_block(common.block(0, "1", transactions))
+
+
+def spend(
+    node: Node, sender: Wallet, recipient: Wallet, amount: int
+) -> tp.Optional[Transaction]:
+    """Sign a transaction the way a peer would, from a possibly stale view of it."""
+    total, transaction_inputs = 0, []
+    for output_id, _, _, output_amount in node.utxos.utxos(sender.public_key):
+        if total >= amount:
+            break
+
+        transaction_inputs.append(output_id)
+        total += output_amount
+
+    if total < amount:
+        return None
+
+    return common.transfer(
+        sender, recipient, transaction_inputs, amount, total - amount
+    )
+
+
+def check(node: Node, n_wallets: int) -> tp.List[str]:
+    """Return every invariant the state of a quiescent node violates."""
+    violations = []
+
+    utxos, blocks, pending = node.utxos, node.blockchain.blocks, list(node.mempool)
+
+    total = sum(utxos.balances.values())
+    if total != FUNDS * n_wallets:
+        violations.append(f"{total} coins exist instead of {FUNDS * n_wallets}")
+
+    for address, output_ids in utxos.addresses.items():
+        balance = sum(utxos.get(output_id)[3] for output_id in output_ids)
+        if balance != utxos.balances[address]:
+            violations.append(f"Balance {utxos.balances[address]} instead of {balance}")
+
+    if sum(len(output_ids) for output_ids in utxos.addresses.values()) != len(utxos):
+        violations.append("The address index and the outputs disagree")
+
+    if len(node.index) != len(blocks) or node.tip.height != len(blocks):
+        violations.append("The index or the tip disagree with the chain")
+
+    result = node.validator.validate(blocks)
+    if not result:
+        violations.append(result.error.message)
+
+    transactions = [t.id for block in blocks for t in block.transactions] + [
+        t.id for t in pending
+    ]
+    duplicates = [id for id, count in Counter(transactions).items() if count > 1]
+    if duplicates:
+        violations.append(f"{len(duplicates)} transactions are included twice")
+
+    for transaction in pending:
+        for output_id in transaction.transaction_inputs:
+            if node.mempool.spent.get(output_id) != transaction.id:
+                violations.append(f"Input {output_id} is not indexed as spent")
+
+    # Replaying the chain and then the pool should reproduce the very same outputs
+    replayed = UTXOSet()
+    try:
+        for transaction in [t for block in blocks for t in block.transactions]:
+            replayed.apply(transaction)
+
+        for transaction in pending:
+            replayed.apply(transaction)
+    except KeyError as e:
+        violations.append(f"Replaying the state failed [{e}]")
+    else:
+        if sorted(replayed) != sorted(utxos):
+            violations.append("Replaying the state yields different outputs")
+
+    return violations
+
+
+@click.command()
+@click.option("--wallets", "n_wallets", type=int, default=6, show_default=True)
+@click.option(
+    "--senders",
+    type=int,
+    default=8,
+    show_default=True,
+    help="Threads receiving transactions of random wallets",
+)
+@click.option(
+    "--creators",
+    type=int,
+    default=2,
+    show_default=True,
+    help="Threads creating transactions of the wallet of the node",
+)
+@click.option("--duration", type=float, default=10, show_default=True)
+@click.option("--capacity", type=int, default=5, show_default=True)
+@click.option(
+    "--rebuild-interval",
+    type=float,
+    default=2,
+    show_default=True,
+    help="Seconds between rebuilding the state from the chain, as after a conflict",
+)
+@click.option("--seed", type=int, default=None)
+def main(
+    n_wallets: int,
+    senders: int,
+    creators: int,
+    duration: float,
+    capacity: int,
+    rebuild_interval: float,
+    seed: tp.Optional[int],
+):
+    logger.remove()
+    random.seed(seed)
+
+    with console.status("Generating wallets"):
+        wallets = [Wallet.generate_wallet() for _ in range(n_wallets)]
+
+    node = Node(
+        ip="127.0.0.1",
+        port=0,
+        capacity=capacity,
+        difficulty=1,
+        n_nodes=2,
+        max_block_wait=0.05,
+    )
+    node.wallet = wallets[0]
+    node.wallets = {wallet.public_key: wallet for wallet in wallets}
+
+    fund(node, wallets)
+
+    stop = threading.Event()
+    counters: tp.Counter[str] = Counter()
+    reads: tp.List[float] = []
+
+    def send() -> None:
+        while not stop.is_set():
+            sender, recipient = random.sample(wallets, 2)
+
+            transaction = spend(node, sender, recipient, random.randint(1, 3))
+            if transaction is None:
+                continue
+
+            # Every now and then the same transaction arrives twice
+            for _ in range(2 if random.random() < 0.1 else 1):
+                result = node.receive_transaction(transaction)
+                counters["received" if result else "rejected"] += 1
+
+    def create() -> None:
+        while not stop.is_set():
+            recipient = random.choice(wallets[1:])
+
+            result = node.create_transaction(recipient.public_key, 1)
+            counters["created" if result else "rejected"] += 1
+
+    def rebuild() -> None:
+        while not stop.wait(rebuild_interval):
+            with node.state.exclusive():
+                node.rebuild_state()
+
+            counters["rebuilds"] += 1
+
+    def read() -> None:
+        while not stop.is_set():
+            start = time.perf_counter()
+            node.utxos.balance(random.choice(wallets).public_key)
+            node.view_transactions()
+            reads.append(time.perf_counter() - start)
+
+            time.sleep(0.001)
+
+    threads = [threading.Thread(target=send) for _ in range(senders)]
+    threads += [threading.Thread(target=create) for _ in range(creators)]
+    threads += [threading.Thread(target=read)]
+    if rebuild_interval > 0:
+        threads += [threading.Thread(target=rebuild)]
+
+    with console.status(f"Running {len(threads)} threads for {duration} seconds"):
+        for thread in threads:
+            thread.start()
+
+        time.sleep(duration)
+        stop.set()
+
+        for thread in threads:
+            thread.join()
+
+    # Blocks may still be mined, so the node is checked while it is kept still
+    with node.state.exclusive():
+        violations = check(node, n_wallets)
+
+    table = Table("Metric", "Value")
+    table.add_row("Transactions received", str(counters["received"]))
+    table.add_row("Transactions created", str(counters["created"]))
+    table.add_row("Transactions rejected", str(counters["rejected"]))
+    table.add_row("State rebuilds", str(counters["rebuilds"]))
+    table.add_row("Blocks", str(node.tip.height))
+    table.add_row("Pending transactions", str(len(node.mempool)))
+    table.add_row("Read latency p50 (ms)", f"{statistics.median(reads) * 1000:.3f}")
+    table.add_row("Read latency max (ms)", f"{max(reads) * 1000:.3f}")
+    console.print(table)
+
+    for violation in violations:
+        console.print(f"[red]{violation}[/red]")
+
+    if not violations:
+        console.print("[green]Every invariant holds[/green]")
+
+    # The mining thread of the node never finishes
+    sys.stdout.flush()
+    os._exit(1 if violations else 0)
+
+
+if __name__ == "__main__":
+    main()
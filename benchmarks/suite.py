@@ -0,0 +1,320 @@
+#!/usr/bin/env python
+
+"""Time the hot paths of a node and compare them against a stored baseline."""
+
+import fnmatch
+import functools
+import json
+import os
+import platform
+import statistics
+import sys
+import typing as tp
+from datetime import datetime
+from pathlib import Path
+
+import click
+from rich.console import Console
+from rich.table import Table
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src" / "server"))
+
+import common  # noqa: E402
+from components import crypto  # noqa: E402
+from components import transaction as transaction_module  # noqa: E402
+from components.block import Block  # noqa: E402
+from components.node import Node  # noqa: E402
+from components.transaction import Transaction  # noqa: E402
+from components.validator import ChainValidator  # noqa: E402
+from components.wallet import Wallet  # noqa: E402
+from core.cli import integers  # noqa: E402
+from loguru import logger  # noqa: E402
+
+BASELINE = Path(__file__).resolve().parent / "baseline.json"
+
+console = Console()
+
+Case = tp.Tuple[str, tp.Callable[[], tp.Any]]
+
+
+class Fixture:
+    """The wallets and signed transactions shared by every benchmark."""
+
+    def __init__(self) -> None:
+        self.sender, self.recipient = Wallet.generate_wallet(), Wallet.generate_wallet()
+        self.transactions: tp.List[Transaction] = []
+        self.blocks: tp.List[Block] = []
+        self.n_transactions = 0
+
+    def transaction(self) -> Transaction:
+        self.n_transactions += 1
+
+        # Distinct inputs give every transaction an id and a signature of its own
+        return common.transfer(
+            self.sender, self.recipient, [f"{self.n_transactions}:0"]
+        )
+
+    def sign(self, n_transactions: int) -> tp.List[Transaction]:
+        while len(self.transactions) < n_transactions:
+            self.transactions.append(self.transaction())
+
+        return self.transactions[:n_transactions]
+
+    def chain(self, n_blocks: int) -> tp.List[Block]:
+        """A chain of one-transaction blocks, of which shorter chains are prefixes."""
+        transactions = self.sign(n_blocks)
+
+        while len(self.blocks) < n_blocks:
+            index = len(self.blocks)
+            previous_hash = self.blocks[-1].current_hash if self.blocks else "1"
+
+            self.blocks.append(
+                common.block(index, previous_hash, [transactions[index]])
+            )
+
+        return self.blocks[:n_blocks]
+
+
+def merkle_root(transactions: tp.List[Transaction]) -> str:
+    return Block.merkle_tree(transactions).root()
+
+
+def validate_chain(validator: ChainValidator, blocks: tp.List[Block]) -> None:
+    # Peers validate chains they have not seen before, so signatures are never cached
+    transaction_module._verify.cache_clear()
+
+    if not validator.validate(blocks):
+        raise RuntimeError("The benchmark chain failed to validate")
+
+
+def micro(fixture: Fixture, transaction_counts: tp.List[int]) -> tp.Iterator[Case]:
+    for n_transactions in transaction_counts:
+        transactions = fixture.sign(n_transactions)
+
+        # The block is built beforehand, so that only its header is hashed
+        yield (
+            f"block.calculate_hash[{n_transactions}]",
+            functools.partial(Block.calculate_hash, common.block(1, "1", transactions)),
+        )
+        yield (
+            f"merkle.root[{n_transactions}]",
+            functools.partial(merkle_root, transactions),
+        )
+
+    sender, recipient = fixture.sender, fixture.recipient
+    yield "transaction.create", lambda: Transaction.create_transaction(
+        sender.public_key, recipient.public_key, 1, [], [], sender.private_key
+    )
+
+    transaction = fixture.transaction()
+    yield "transaction.sign", functools.partial(
+        transaction.sign_transaction, sender.private_key
+    )
+    yield "transaction.verify", functools.partial(
+        transaction_module._verify.__wrapped__,
+        crypto.scheme().name,
+        transaction.sender_address,
+        transaction.id,
+        transaction.signature,
+    )
+
+    yield "wallet.generate", Wallet.generate_wallet
+
+
+def macro(fixture: Fixture, chain_lengths: tp.List[int]) -> tp.Iterator[Case]:
+    validator = ChainValidator()
+    for n_blocks in chain_lengths:
+        yield (
+            f"node.validate_chain[{n_blocks}]",
+            functools.partial(validate_chain, validator, fixture.chain(n_blocks)),
+        )
+
+    # A standalone node whose blocks never fill up, so nothing is mined meanwhile
+    node = Node(
+        ip="127.0.0.1",
+        port=0,
+        capacity=sys.maxsize,
+        difficulty=1,
+        n_nodes=2,
+        mempool_size=sys.maxsize,
+    )
+    node.wallet = fixture.sender
+    node.wallets = {
+        fixture.sender.public_key: fixture.sender,
+        fixture.recipient.public_key: fixture.recipient,
+    }
+    node.utxos.credit(("genesis:0", "genesis", fixture.sender.public_key, sys.maxsize))
+
+    def create_transaction() -> None:
+        if not node.create_transaction(fixture.recipient.public_key, 1):
+            raise RuntimeError("The benchmark node failed to create a transaction")
+
+    yield "node.create_transaction", create_transaction
+
+
+def measure(function: tp.Callable[[], tp.Any], repeat: int) -> tp.Dict[str, float]:
+    number, runs = common.timings(function, repeat)
+
+    return {
+        "median": statistics.median(runs),
+        "min": min(runs),
+        "mean": statistics.mean(runs),
+        "stdev": statistics.stdev(runs) if len(runs) > 1 else 0.0,
+        "ops": 1 / statistics.median(runs),
+        "number": number,
+        "repeat": repeat,
+    }
+
+
+def environment() -> tp.Dict[str, tp.Any]:
+    return {
+        "timestamp": datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def compare(
+    results: tp.Dict[str, tp.Dict[str, float]],
+    baseline: tp.Dict[str, tp.Dict[str, float]],
+    threshold: float,
+) -> tp.List[str]:
+    """Print the results next to the baseline and return the names of regressions."""
+    table = Table("Benchmark", "Median (ms)", "Ops/s", "Baseline (ms)", "Change")
+
+    regressions = []
+    for name, result in results.items():
+        median, reference = result["median"], baseline.get(name, {}).get("median")
+
+        if reference is None:
+            table.add_row(
+                name, f"{median * 1000:.3f}", f"{result['ops']:.1f}", "-", "-"
+            )
+            continue
+
+        change = median / reference - 1
+        if change > threshold:
+            regressions.append(name)
+            style = "red"
+        elif change < -threshold:
+            style = "green"
+        else:
+            style = ""
+
+        table.add_row(
+            name,
+            f"{median * 1000:.3f}",
+            f"{result['ops']:.1f}",
+            f"{reference * 1000:.3f}",
+            f"[{style}]{change:+.1%}[/{style}]" if style else f"{change:+.1%}",
+        )
+
+    console.print(table)
+
+    return regressions
+
+
+@click.command()
+@click.option(
+    "--transactions",
+    "transaction_counts",
+    default="1,10,100,1000",
+    show_default=True,
+    callback=integers,
+    help="The numbers of transactions of the hashed blocks",
+)
+@click.option(
+    "--chains",
+    "chain_lengths",
+    default="100,1000,10000",
+    show_default=True,
+    callback=integers,
+    help="The numbers of blocks of the validated chains",
+)
+@click.option("--repeat", type=int, default=5, show_default=True)
+@click.option(
+    "-k",
+    "--select",
+    default="*",
+    show_default=True,
+    help="A glob pattern matching the names of the benchmarks to run",
+)
+@click.option(
+    "-o",
+    "--output",
+    type=click.Path(dir_okay=False, writable=True, path_type=Path),
+    default=None,
+    help="A file to write the results to, as JSON",
+)
+@click.option(
+    "--baseline",
+    type=click.Path(dir_okay=False, path_type=Path),
+    default=BASELINE,
+    show_default=True,
+    help="A file of previous results to compare against",
+)
+@click.option(
+    "--threshold",
+    type=float,
+    default=0.2,
+    show_default=True,
+    help="The relative slowdown over the baseline reported as a regression",
+)
+@click.option(
+    "--update-baseline",
+    default=False,
+    is_flag=True,
+    help="Overwrite the baseline with the results",
+)
+def main(
+    transaction_counts: tp.List[int],
+    chain_lengths: tp.List[int],
+    repeat: int,
+    select: str,
+    output: tp.Optional[Path],
+    baseline: Path,
+    threshold: float,
+    update_baseline: bool,
+):
+    # Logging is part of neither the hot paths nor the report
+    logger.remove()
+
+    fixture = Fixture()
+
+    results = {}
+    for cases in (micro(fixture, transaction_counts), macro(fixture, chain_lengths)):
+        for name, function in cases:
+            if not fnmatch.fnmatch(name, select):
+                continue
+
+            with console.status(f"Running {name}"):
+                results[name] = measure(function, repeat)
+
+    report = {"environment": environment(), "results": results}
+
+    previous = {}
+    if baseline.exists():
+        previous = json.loads(baseline.read_text())["results"]
+
+    regressions = compare(results, previous, threshold)
+    if regressions:
+        console.print(f"[red]{len(regressions)} regression(s) over {baseline}[/red]")
+
+    if output is not None:
+        output.write_text(json.dumps(report, indent=2))
+
+    if update_baseline:
+        # Benchmarks left out by the selection keep their previous results
+        merged = {**report, "results": {**previous, **results}}
+        baseline.write_text(json.dumps(merged, indent=2))
+
+    # The benchmark node keeps its mining thread alive, so the process is ended here
+    sys.stdout.flush()
+    os._exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
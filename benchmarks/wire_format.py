@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+
+"""Compare the payload size and parse time of the JSON and binary wire formats."""
+
+import sys
+from pathlib import Path
+
+import click
+from rich.console import Console
+from rich.table import Table
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src" / "server"))
+
+import common  # noqa: E402
+from components.blockchain import Blockchain  # noqa: E402
+from components.wallet import Wallet  # noqa: E402
+
+console = Console()
+
+
+@click.command()
+@click.option("--blocks", type=int, default=100, show_default=True)
+@click.option("--capacity", type=int, default=5, show_default=True)
+@click.option("--repeat", type=int, default=5, show_default=True)
+def main(blocks: int, capacity: int, repeat: int):
+    wallets = [Wallet.generate_wallet(), Wallet.generate_wallet()]
+    blockchain = Blockchain(blocks=common.chain(wallets, blocks, capacity))
+
+    table = Table("Model", "Format", "Size (bytes)", "Parse (ms)")
+    for name, instance in (
+        ("Transaction", blockchain.blocks[-1].transactions[-1]),
+        ("Block", blockchain.blocks[-1]),
+        ("Blockchain", blockchain),
+    ):
+        model = type(instance)
+        for format, payload, parse in (
+            ("json", instance.json(), model.from_json),
+            ("binary", instance.to_bytes(), model.from_bytes),
+        ):
+            elapsed = common.measure(lambda: parse(payload), repeat)
+
+            table.add_row(name, format, str(len(payload)), f"{elapsed:.3f}")
+
+    console.print(table)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,16 @@
 import json
+import sys
 import typing as tp
+from pathlib import Path
 
 import click
 import requests
 from rich.console import Console
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "server"))
+
+from core.workload import Workload, read_transactions  # noqa: E402
+
 console = Console()
 
 
@@ -86,5 +92,79 @@ def create(settings: tp.Dict[str, tp.Any], recipient: str, amount: int):
         console.print({"status": response.status_code, "error": response.json()})
 
 
+@transactions.command()
+@click.argument(
+    "filepath",
+    type=click.Path(
+        exists=True, file_okay=True, dir_okay=False, readable=True, path_type=Path
+    ),
+)
+@click.option(
+    "-r",
+    "--rate",
+    type=float,
+    default=None,
+    help="Transactions per second to create, or as many as possible",
+)
+@click.option(
+    "-c",
+    "--concurrency",
+    type=int,
+    default=1,
+    show_default=True,
+    help="The maximum number of transactions being created at once",
+)
+@click.option(
+    "-t",
+    "--timeout",
+    type=float,
+    default=60,
+    show_default=True,
+    help="Seconds to wait for the last transactions to be confirmed",
+)
+@click.pass_obj
+def load(
+    settings: tp.Dict[str, tp.Any],
+    filepath: Path,
+    rate: tp.Optional[float],
+    concurrency: int,
+    timeout: float,
+):
+    """Create the transactions of a file and report their latency and throughput"""
+    response = requests.get(f"{settings['node']}/nodes/")
+    if response.status_code != 200:
+        console.print({"status": response.status_code, "error": response.json()})
+        return
+
+    network = [node["public_key"] for node in response.json()["nodes"]]
+
+    session = requests.Session()
+
+    def submit(node_id: int, amount: int) -> tp.Optional[str]:
+        response = session.post(
+            f"{settings['node']}/transactions/create",
+            json={"recipient_address": network[node_id], "amount": amount},
+        )
+        if response.status_code != 200:
+            return None
+
+        return response.json()["id"]
+
+    def confirmed(transaction_id: str) -> bool:
+        response = session.get(f"{settings['node']}/transactions/{transaction_id}")
+
+        return response.status_code == 200
+
+    workload = Workload(
+        submit,
+        confirmed,
+        rate=rate,
+        concurrency=concurrency,
+        confirmation_timeout=timeout,
+    )
+
+    console.print_json(data=workload.run(read_transactions(filepath)))
+
+
 if __name__ == "__main__":
     cli()
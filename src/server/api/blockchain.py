@@ -1,5 +1,5 @@
 from core.blueprint import Blueprint
-from flask import current_app
+from flask import current_app, request
 from loguru import logger
 
 blueprint = Blueprint("blockchain", __name__)
@@ -7,6 +7,27 @@ blueprint = Blueprint("blockchain", __name__)
 
 @blueprint.route("/", methods=["GET"])
 def broadcast():
-    logger.info("Transmitting blockchain of node {}", current_app.node.id)
+    """
+    Stream the blocks from index `from` up to, but excluding, index `to`, or just
+    their headers when `headers` is set.
+    """
+    blocks = current_app.node.blockchain.blocks
 
-    return blueprint.success(current_app.node.blockchain.json())
+    start = request.args.get("from", 0, type=int)
+    stop = request.args.get("to", len(blocks), type=int)
+    headers = request.args.get("headers", "false").lower() in ("1", "true", "yes")
+
+    if start < 0 or stop < start:
+        blueprint.bad_request(f"Invalid block range [{start}, {stop})")
+
+    stop = min(stop, len(blocks))
+
+    logger.info(
+        "Transmitting blocks [{}, {}) of node {}", start, stop, current_app.node.id
+    )
+
+    def generate():
+        for index in range(start, stop):
+            yield blocks[index].to_header() if headers else blocks[index]
+
+    return blueprint.stream("blocks", generate())
@@ -1,6 +1,6 @@
 from components.block import Block
 from core.blueprint import Blueprint
-from flask import current_app, request
+from flask import current_app
 from loguru import logger
 
 blueprint = Blueprint("blocks", __name__)
@@ -8,15 +8,34 @@ blueprint = Blueprint("blocks", __name__)
 
 @blueprint.route("/broadcast", methods=["POST"])
 def broadcast():
-    block = Block.from_json(request.json)
+    block = blueprint.parse(Block)
 
     logger.info("Received block {}", block.index)
 
     result = current_app.node.validate_block(block)
+    if result:
+        result = current_app.node.persist_block(block)
+
     if not result:
         current_app.node.resolve_conflict()
         return blueprint.success({"success": True, "message": "Synced blockchain"})
 
-    current_app.node.persist_block(block)
-
     return blueprint.success()
+
+
+@blueprint.route("/<block_hash>", methods=["GET"])
+def block(block_hash: str):
+    result = current_app.node.find_block(block_hash)
+    if not result:
+        blueprint.error(result.error)
+
+    return blueprint.serialize(result.payload)
+
+
+@blueprint.route("/<int:index>/proof/<transaction_id>", methods=["GET"])
+def proof(index: int, transaction_id: str):
+    result = current_app.node.prove_transaction(index, transaction_id)
+    if not result:
+        blueprint.error(result.error)
+
+    return blueprint.success(result.payload)
@@ -1,11 +1,22 @@
 from core.blueprint import Blueprint
-from flask import current_app
+from flask import current_app, request
 
 blueprint = Blueprint("metrics", __name__)
 
+# The content type of the Prometheus text exposition format
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
 
 @blueprint.route("/", methods=["GET"])
 def view():
+    mimetype = request.accept_mimetypes.best_match(["application/json", "text/plain"])
+    if mimetype == "text/plain":
+        return (
+            current_app.node.registry.to_prometheus(),
+            200,
+            {"Content-Type": PROMETHEUS_CONTENT_TYPE},
+        )
+
     return blueprint.success(current_app.node.metrics)
 
 
@@ -1,4 +1,5 @@
 from components.blockchain import Blockchain
+from components.snapshot import Snapshot
 from components.wallet import Wallet
 from core.blueprint import Blueprint
 from flask import current_app, request
@@ -6,6 +7,18 @@ from flask import current_app, request
 blueprint = Blueprint("nodes", __name__)
 
 
+@blueprint.route("/", methods=["GET"])
+def network():
+    return blueprint.success(
+        {
+            "nodes": [
+                {"address": remote_address, "public_key": public_key}
+                for remote_address, public_key in current_app.node.network
+            ]
+        }
+    )
+
+
 @blueprint.route("/register", methods=["POST"])
 def register():
     if not current_app.node.is_bootstrap:
@@ -33,13 +46,15 @@ def enroll():
     network = payload.get("network", None)
     blockchain = payload.get("blockchain", None)
     wallets = payload.get("wallets", None)
+    snapshot = payload.get("snapshot", None)
 
     if not network or not blockchain:
         blueprint.bad_request("Either network or blockchain is empty or null")
 
     blockchain = Blockchain.from_json(blockchain)
     wallets = [Wallet.from_json(wallet) for wallet in wallets]
-    result = current_app.node.enroll_acknowledge(network, blockchain, wallets)
+    snapshot = Snapshot.from_json(snapshot) if snapshot is not None else None
+    result = current_app.node.enroll_acknowledge(network, blockchain, wallets, snapshot)
     if not result:
         blueprint.error(result.error)
 
@@ -1,4 +1,4 @@
-from components.transaction import Transaction
+from components.transaction import Transaction, TransactionBatch
 from core.blueprint import Blueprint
 from flask import current_app, request
 from loguru import logger
@@ -13,6 +13,15 @@ def transactions():
     return blueprint.success({"transactions": [t.json() for t in transactions]})
 
 
+@blueprint.route("/<transaction_id>", methods=["GET"])
+def transaction(transaction_id: str):
+    result = current_app.node.find_transaction(transaction_id)
+    if not result:
+        blueprint.error(result.error)
+
+    return blueprint.success(result.payload)
+
+
 @blueprint.route("/create", methods=["POST"])
 def create():
     payload = request.json
@@ -23,20 +32,38 @@ def create():
     if not result:
         blueprint.error(result.error)
 
-    return blueprint.success()
+    return blueprint.success({"id": result.payload.id})
 
 
 @blueprint.route("/broadcast", methods=["POST"])
 def broadcast():
-    payload = request.json
-    transaction = Transaction.from_json(payload)
+    transaction = blueprint.parse(Transaction)
 
     logger.info("Received transaction {}", transaction.id)
 
-    result = current_app.node.validate_transaction(transaction)
+    result = current_app.node.receive_transaction(transaction)
     if not result:
         blueprint.error(result.error)
 
-    current_app.node.persist_transaction(transaction)
-
     return blueprint.success()
+
+
+@blueprint.route("/broadcast/batch", methods=["POST"])
+def broadcast_batch():
+    batch = blueprint.parse(TransactionBatch)
+
+    logger.info("Received batch of {} transactions", len(batch.transactions))
+
+    results = []
+    for transaction in batch.transactions:
+        result = current_app.node.receive_transaction(transaction)
+
+        results.append(
+            {
+                "id": transaction.id,
+                "success": bool(result),
+                "message": None if result else result.error.message,
+            }
+        )
+
+    return blueprint.success({"results": results})
@@ -6,6 +6,6 @@ blueprint = Blueprint("wallet", __name__)
 
 @blueprint.route("/balance", methods=["GET"])
 def balance():
-    balance = current_app.node.wallet.balance
+    balance = current_app.node.balance
 
     return blueprint.success({"balance": balance})
@@ -1,5 +1,6 @@
 import typing as tp
 
+from core.codec import Reader, Writer
 from pydantic import BaseModel
 
 
@@ -14,3 +15,35 @@ class Serializable(BaseModel):
             return cls.parse_raw(representation)
         else:
             raise TypeError(f"Parsing '{type(representation)}' is not supported")
+
+    @classmethod
+    def from_bytes(cls, representation: bytes) -> "Serializable":
+        reader = Reader(representation)
+
+        # Truncated or corrupt encodings run off the end of the data or out of range
+        try:
+            instance = cls.decode(reader)
+        except (IndexError, OverflowError) as e:
+            raise ValueError(f"Malformed '{cls.__name__}' [{e}]") from e
+
+        if not reader.done():
+            raise ValueError(f"Trailing data after '{cls.__name__}'")
+
+        return instance
+
+    @classmethod
+    def supports_bytes(cls) -> bool:
+        return cls.encode is not Serializable.encode
+
+    def to_bytes(self) -> bytes:
+        writer = Writer()
+        self.encode(writer)
+
+        return writer.getvalue()
+
+    def encode(self, writer: Writer) -> None:
+        raise NotImplementedError(f"'{type(self).__name__}' has no binary encoding")
+
+    @classmethod
+    def decode(cls, reader: Reader) -> "Serializable":
+        raise NotImplementedError(f"'{cls.__name__}' has no binary encoding")
@@ -0,0 +1,65 @@
+import threading
+import typing as tp
+
+
+class AddressRegistry:
+    """
+    Interns wallet addresses, numbering each one the first time it is registered so
+    that indexes can be keyed by a small integer rather than by a key of hundreds of
+    characters. Registered addresses are kept as a single string each, which every
+    decoded copy of them is swapped for. Ids are only meaningful within a process.
+
+    Addresses are never forgotten, so only the participants of the network and the
+    addresses credited by valid transactions are registered. Looking up an address
+    takes no locks.
+    """
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+
+        self.ids: tp.Dict[str, int] = {}
+        self.addresses: tp.List[str] = []
+
+    def __len__(self) -> int:
+        return len(self.addresses)
+
+    def __contains__(self, address: str) -> bool:
+        return address in self.ids
+
+    def intern(self, address: str) -> int:
+        """Return the id of an address, registering it if it is unknown."""
+        id = self.ids.get(address)
+        if id is not None:
+            return id
+
+        with self.lock:
+            id = self.ids.get(address)
+            if id is None:
+                # The address is listed first, so that an id is never handed out
+                # before it can be resolved
+                id = len(self.addresses)
+                self.addresses.append(address)
+                self.ids[address] = id
+
+            return id
+
+    def register(self, address: str) -> str:
+        """Register an address, returning its registered copy."""
+        return self.addresses[self.intern(address)]
+
+    def find(self, address: str) -> tp.Optional[int]:
+        """Return the id of an address without registering it."""
+        return self.ids.get(address)
+
+    def address(self, id: int) -> str:
+        return self.addresses[id]
+
+    def canonical(self, address: str) -> str:
+        """Return the registered copy of an address, or the address if it is unknown."""
+        id = self.ids.get(address)
+
+        return self.addresses[id] if id is not None else address
+
+
+# Every node of a process shares the same registry
+REGISTRY = AddressRegistry()
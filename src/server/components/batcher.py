@@ -0,0 +1,69 @@
+import threading
+import time
+import typing as tp
+
+from loguru import logger
+
+T = tp.TypeVar("T")
+
+
+class Batcher(tp.Generic[T]):
+    """
+    Buffers outgoing items and hands them over to `send` in batches, either once
+    `window` seconds have passed since the first buffered item or as soon as
+    `max_size` items have been buffered, whichever comes first. Batches are sent in
+    the order their items were added. A non-positive window disables buffering.
+    """
+
+    def __init__(
+        self, send: tp.Callable[[tp.List[T]], None], window: float, max_size: int
+    ) -> None:
+        self.send = send
+        self.window = window
+        self.max_size = max(max_size, 1)
+
+        self.buffer: tp.List[T] = []
+        self.condition = threading.Condition()
+        self.sending = threading.Lock()
+
+        if self.window > 0:
+            threading.Thread(target=self.run, daemon=True).start()
+
+    def add(self, item: T) -> None:
+        if self.window <= 0:
+            with self.sending:
+                self.send([item])
+
+            return
+
+        with self.condition:
+            self.buffer.append(item)
+
+            if len(self.buffer) == 1 or len(self.buffer) >= self.max_size:
+                self.condition.notify()
+
+    def flush(self) -> None:
+        with self.sending:
+            with self.condition:
+                batch, self.buffer = self.buffer, []
+
+            if batch:
+                self.send(batch)
+
+    def run(self) -> None:
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: self.buffer)
+
+                deadline = time.monotonic() + self.window
+                while len(self.buffer) < self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+
+                    self.condition.wait(remaining)
+
+            try:
+                self.flush()
+            except Exception as e:
+                logger.exception("Failed to send batch: {}", e)
@@ -3,7 +3,9 @@ import typing as tp
 from datetime import datetime
 
 from components import Serializable
+from components.merkle import MerkleTree
 from components.transaction import Transaction
+from core.codec import Reader, Writer
 from pydantic import Field
 
 
@@ -13,11 +15,99 @@ class Block(Serializable):
     nonce: int
     previous_hash: str
     transactions: tp.List[Transaction] = Field(default_factory=list)
+    merkle_root: tp.Optional[str] = None
     current_hash: tp.Optional[str] = None
 
+    def encode(self, writer: Writer) -> None:
+        writer.uvarint(self.index)
+        writer.timestamp(self.timestamp)
+        writer.uvarint(self.nonce)
+        writer.string(self.previous_hash)
+        writer.sequence(self.transactions, lambda t: t.encode(writer))
+        writer.string(self.merkle_root)
+        writer.string(self.current_hash)
+
+    @classmethod
+    def decode(cls, reader: Reader) -> "Block":
+        return cls.construct(
+            index=reader.uvarint(),
+            timestamp=reader.timestamp(),
+            nonce=reader.uvarint(),
+            previous_hash=reader.string(),
+            transactions=reader.sequence(lambda: Transaction.decode(reader)),
+            merkle_root=reader.string(),
+            current_hash=reader.string(),
+        )
+
     @classmethod
-    def calculate_hash(cls, block: "Block", include_hash: bool = False) -> None:
-        data = block.json() if include_hash else block.json(exclude={"current_hash"})
-        data = data.encode("utf-8")
+    def merkle_tree(cls, transactions: tp.List[Transaction]) -> MerkleTree:
+        return MerkleTree(
+            transaction.json().encode("utf-8") for transaction in transactions
+        )
+
+    def header(self) -> bytes:
+        """
+        Serialize the static part of the block header, meaning every field but the
+        nonce, which is appended to it as a fixed-size big-endian integer.
+        """
+        header = (
+            str(self.index),
+            self.timestamp.isoformat(),
+            self.previous_hash,
+            self.merkle_root,
+        )
+
+        return "|".join(header).encode("utf-8")
+
+    @classmethod
+    def hash_nonce(cls, state: "hashlib._Hash", nonce: int) -> str:
+        state = state.copy()
+        state.update(nonce.to_bytes(8, "big"))
+
+        return state.hexdigest()
+
+    @classmethod
+    def calculate_hash(cls, block: "Block") -> str:
+        return cls.hash_nonce(hashlib.sha256(block.header()), block.nonce)
+
+    def to_header(self) -> "BlockHeader":
+        return BlockHeader.construct(
+            index=self.index,
+            timestamp=self.timestamp,
+            nonce=self.nonce,
+            previous_hash=self.previous_hash,
+            merkle_root=self.merkle_root,
+            current_hash=self.current_hash,
+        )
 
-        return hashlib.sha256(data).hexdigest()
+
+class BlockHeader(Serializable):
+    """Every field of a block but its transactions, enough to verify its hash."""
+
+    index: int
+    timestamp: datetime
+    nonce: int
+    previous_hash: str
+    merkle_root: tp.Optional[str] = None
+    current_hash: tp.Optional[str] = None
+
+    header = Block.header
+
+    def encode(self, writer: Writer) -> None:
+        writer.uvarint(self.index)
+        writer.timestamp(self.timestamp)
+        writer.uvarint(self.nonce)
+        writer.string(self.previous_hash)
+        writer.string(self.merkle_root)
+        writer.string(self.current_hash)
+
+    @classmethod
+    def decode(cls, reader: Reader) -> "BlockHeader":
+        return cls.construct(
+            index=reader.uvarint(),
+            timestamp=reader.timestamp(),
+            nonce=reader.uvarint(),
+            previous_hash=reader.string(),
+            merkle_root=reader.string(),
+            current_hash=reader.string(),
+        )
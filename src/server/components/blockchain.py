@@ -1,9 +1,63 @@
 import typing as tp
+from pathlib import Path
 
 from components import Serializable
 from components.block import Block
+from components.store import BlockStore, PackedBlocks
+from core.codec import Reader, Writer
 from pydantic import Field
 
 
+class Tip(tp.NamedTuple):
+    """The last block of a chain along with the length of the chain."""
+
+    height: int
+    block: Block
+
+
 class Blockchain(Serializable):
     blocks: tp.List[Block] = Field(default_factory=list)
+
+    @classmethod
+    def open(cls, directory: Path) -> "Blockchain":
+        """Open the chain persisted under a directory, creating it if missing."""
+        return cls.construct(blocks=BlockStore(directory))
+
+    @classmethod
+    def packed(cls) -> "Blockchain":
+        """Create an empty chain whose blocks are kept in memory, binary-encoded."""
+        return cls.construct(blocks=PackedBlocks())
+
+    def materialize(self) -> "Blockchain":
+        """Return a copy of the chain whose blocks are all held in memory."""
+        if isinstance(self.blocks, list):
+            return self
+
+        return type(self).construct(blocks=list(self.blocks))
+
+    def dict(self, **kwargs) -> tp.Dict[str, tp.Any]:
+        if isinstance(self.blocks, list):
+            return super().dict(**kwargs)
+
+        return self.materialize().dict(**kwargs)
+
+    def json(self, **kwargs) -> str:
+        if isinstance(self.blocks, list):
+            return super().json(**kwargs)
+
+        return self.materialize().json(**kwargs)
+
+    def encode(self, writer: Writer) -> None:
+        if isinstance(self.blocks, list):
+            writer.sequence(self.blocks, lambda block: block.encode(writer))
+            return
+
+        # Stored blocks are already encoded and are copied as they are
+        writer.sequence(
+            range(len(self.blocks)),
+            lambda height: writer.raw(self.blocks.encoded(height)),
+        )
+
+    @classmethod
+    def decode(cls, reader: Reader) -> "Blockchain":
+        return cls.construct(blocks=reader.sequence(lambda: Block.decode(reader)))
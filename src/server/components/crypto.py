@@ -0,0 +1,166 @@
+import functools
+import typing as tp
+
+from Crypto.Hash import SHA256
+from Crypto.PublicKey import ECC, RSA
+from Crypto.Signature import DSS, PKCS1_v1_5, eddsa
+
+# The number of parsed keys kept in memory
+KEY_CACHE_SIZE = 1024
+
+Signer = tp.Callable[[bytes], bytes]
+Verifier = tp.Callable[[bytes, bytes], bool]
+
+
+class Scheme:
+    """
+    A digital signature scheme, whose keys and signatures are exchanged as hex strings.
+    Public keys double as the addresses of wallets.
+    """
+
+    name: tp.ClassVar[str]
+
+    def generate(self) -> tp.Tuple[str, str]:
+        """Return a new public and private key."""
+        raise NotImplementedError
+
+    def signer(self, private_key: str) -> Signer:
+        raise NotImplementedError
+
+    def verifier(self, public_key: str) -> Verifier:
+        raise NotImplementedError
+
+    def sign(self, private_key: str, message: bytes) -> str:
+        return _signer(self.name, private_key)(message).hex()
+
+    def verify(self, public_key: str, message: bytes, signature: str) -> bool:
+        """Check a signature, treating malformed keys and signatures as invalid."""
+        try:
+            verifier = _verifier(self.name, public_key)
+
+            return verifier(message, bytes.fromhex(signature))
+        except (ValueError, TypeError, IndexError):
+            return False
+
+
+class RSAScheme(Scheme):
+    """RSA with PKCS#1 v1.5 signatures over SHA-256, and keys exported as PEM."""
+
+    name = "rsa"
+
+    def __init__(self, bits: int = 2048) -> None:
+        self.bits = bits
+
+    def generate(self) -> tp.Tuple[str, str]:
+        key = RSA.generate(self.bits)
+
+        return key.publickey().export_key().hex(), key.export_key().hex()
+
+    def signer(self, private_key: str) -> Signer:
+        signer = PKCS1_v1_5.new(RSA.import_key(bytes.fromhex(private_key)))
+
+        return lambda message: signer.sign(SHA256.new(message))
+
+    def verifier(self, public_key: str) -> Verifier:
+        verifier = PKCS1_v1_5.new(RSA.import_key(bytes.fromhex(public_key)))
+
+        return lambda message, signature: verifier.verify(
+            SHA256.new(message), signature
+        )
+
+
+class Ed25519Scheme(Scheme):
+    """Ed25519 signatures, with 32-byte raw public keys and seeds as private keys."""
+
+    name = "ed25519"
+
+    def generate(self) -> tp.Tuple[str, str]:
+        key = ECC.generate(curve="Ed25519")
+
+        return key.public_key().export_key(format="raw").hex(), key.seed.hex()
+
+    def signer(self, private_key: str) -> Signer:
+        key = ECC.construct(curve="Ed25519", seed=bytes.fromhex(private_key))
+
+        return eddsa.new(key, "rfc8032").sign
+
+    def verifier(self, public_key: str) -> Verifier:
+        verifier = eddsa.new(
+            eddsa.import_public_key(bytes.fromhex(public_key)), "rfc8032"
+        )
+
+        def verify(message: bytes, signature: bytes) -> bool:
+            try:
+                verifier.verify(message, signature)
+            except ValueError:
+                return False
+
+            return True
+
+        return verify
+
+
+class ECDSAScheme(Scheme):
+    """
+    Deterministic ECDSA over NIST P-256 and SHA-256, with compressed 33-byte public keys
+    and private keys as their 32-byte secret scalar.
+    """
+
+    name = "ecdsa"
+
+    CURVE = "P-256"
+
+    def generate(self) -> tp.Tuple[str, str]:
+        key = ECC.generate(curve=self.CURVE)
+
+        public_key = key.public_key().export_key(format="SEC1", compress=True)
+
+        return public_key.hex(), int(key.d).to_bytes(32, "big").hex()
+
+    def signer(self, private_key: str) -> Signer:
+        key = ECC.construct(curve=self.CURVE, d=int(private_key, 16))
+        signer = DSS.new(key, "deterministic-rfc6979")
+
+        return lambda message: signer.sign(SHA256.new(message))
+
+    def verifier(self, public_key: str) -> Verifier:
+        key = ECC.import_key(bytes.fromhex(public_key), curve_name=self.CURVE)
+        verifier = DSS.new(key, "fips-186-3")
+
+        def verify(message: bytes, signature: bytes) -> bool:
+            try:
+                verifier.verify(SHA256.new(message), signature)
+            except ValueError:
+                return False
+
+            return True
+
+        return verify
+
+
+SCHEMES: tp.Dict[str, Scheme] = {
+    scheme.name: scheme for scheme in (RSAScheme(), Ed25519Scheme(), ECDSAScheme())
+}
+
+# Every node of a cluster has to sign and verify with the same scheme
+_scheme: Scheme = SCHEMES["rsa"]
+
+
+def use_scheme(name: str) -> None:
+    global _scheme
+
+    _scheme = SCHEMES[name]
+
+
+def scheme() -> Scheme:
+    return _scheme
+
+
+@functools.lru_cache(maxsize=KEY_CACHE_SIZE)
+def _signer(name: str, private_key: str) -> Signer:
+    return SCHEMES[name].signer(private_key)
+
+
+@functools.lru_cache(maxsize=KEY_CACHE_SIZE)
+def _verifier(name: str, public_key: str) -> Verifier:
+    return SCHEMES[name].verifier(public_key)
@@ -0,0 +1,71 @@
+import threading
+import typing as tp
+
+from components.block import Block
+from core.codec import compact
+
+Key = tp.Union[bytes, str]
+
+
+class ChainIndex:
+    """
+    Maps block hashes to their height and transaction ids to the height of the
+    block including them along with their position in it, so that neither lookup
+    has to scan the chain. Entries are kept per height so that truncating the chain
+    only touches the entries of the discarded blocks. Hashes and ids are held as the
+    bytes they encode and positions are packed into a single integer.
+    """
+
+    def __init__(self, blocks: tp.Iterable[Block] = ()) -> None:
+        self.lock = threading.Lock()
+
+        self.blocks: tp.Dict[Key, int] = {}
+        self.transactions: tp.Dict[Key, int] = {}
+
+        self.hashes: tp.List[Key] = []
+        self.transaction_ids: tp.List[tp.List[Key]] = []
+
+        for block in blocks:
+            self.append(block)
+
+    def __len__(self) -> int:
+        return len(self.hashes)
+
+    def height(self, block_hash: str) -> tp.Optional[int]:
+        return self.blocks.get(compact(block_hash))
+
+    def locate(self, transaction_id: str) -> tp.Optional[tp.Tuple[int, int]]:
+        """Return the height of the block including a transaction and its position."""
+        location = self.transactions.get(compact(transaction_id))
+        if location is None:
+            return None
+
+        return location >> 32, location & 0xFFFFFFFF
+
+    def append(self, block: Block) -> None:
+        with self.lock:
+            height = len(self.hashes)
+
+            block_hash = compact(block.current_hash)
+            self.blocks[block_hash] = height
+            self.hashes.append(block_hash)
+
+            transaction_ids = [
+                compact(transaction.id) for transaction in block.transactions
+            ]
+            for position, transaction_id in enumerate(transaction_ids):
+                self.transactions[transaction_id] = height << 32 | position
+            self.transaction_ids.append(transaction_ids)
+
+    def truncate(self, height: int) -> None:
+        """Discard the entries of every block from `height` onwards."""
+        with self.lock:
+            for block_hash in self.hashes[height:]:
+                self.blocks.pop(block_hash, None)
+
+            for transaction_ids in self.transaction_ids[height:]:
+                for transaction_id in transaction_ids:
+                    self.transactions.pop(transaction_id, None)
+
+            del self.hashes[height:]
+            del self.transaction_ids[height:]
@@ -0,0 +1,253 @@
+import threading
+import typing as tp
+from collections import Counter, OrderedDict
+
+from components.merkle import MerkleTree, hash_leaf
+from components.transaction import Transaction
+from components.utxo import UTXO
+
+# The maximum number of pending transactions
+MEMPOOL_SIZE = 10000
+
+# A pending transaction along with the outputs it has spent
+Entry = tp.Tuple[Transaction, tp.List[UTXO]]
+
+# The entries, spent outputs, leaf hashes and counters of a pool at some point in time
+Checkpoint = tp.Tuple[
+    tp.Dict[str, Entry], tp.Dict[str, str], tp.Dict[str, bytes], tp.Counter[str]
+]
+
+
+class Mempool:
+    """
+    The pending transactions of a node in arrival order, keyed by id, along with an
+    index from every output they spend to the transaction spending it, so that
+    duplicates and double spends are detected in O(1). Once full, the oldest
+    transactions are evicted along with every pending transaction depending on them.
+    Entries also keep the outputs each transaction has spent, which the node needs in
+    order to undo the transactions leaving the pool without being mined.
+
+    The leaf hash of every transaction is kept as well, so that the Merkle tree, which
+    is extended as transactions arrive, is rebuilt without serializing them again once
+    some leave the pool. The rebuild waits for the next snapshot, so that removals,
+    which happen while the node holds its state exclusively, stay cheap.
+    """
+
+    def __init__(self, max_size: int = MEMPOOL_SIZE) -> None:
+        self.max_size = max(max_size, 1)
+
+        self.lock = threading.RLock()
+        self.changed = threading.Condition(self.lock)
+        self.entries: tp.Dict[str, Entry] = OrderedDict()
+        self.spent: tp.Dict[str, str] = {}
+        self.leaves: tp.Dict[str, bytes] = {}
+        self.tree: tp.Optional[MerkleTree] = MerkleTree()
+
+        self.counters = Counter()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, transaction_id: str) -> bool:
+        return transaction_id in self.entries
+
+    def __iter__(self) -> tp.Iterator[Transaction]:
+        with self.lock:
+            transactions = [transaction for transaction, _ in self.entries.values()]
+
+        return iter(transactions)
+
+    @property
+    def full(self) -> bool:
+        return len(self.entries) >= self.max_size
+
+    @property
+    def statistics(self) -> tp.Dict[str, int]:
+        return {"size": len(self.entries), "max_size": self.max_size, **self.counters}
+
+    def reject(self, reason: str) -> None:
+        self.counters[f"rejected_{reason}"] += 1
+
+    def wait(self, size: int, timeout: tp.Optional[float] = None) -> None:
+        """
+        Block until `size` transactions are pending or, given a timeout, until some
+        transactions have been pending for `timeout` seconds without filling up.
+        """
+        with self.changed:
+            while len(self.entries) < size:
+                if timeout is None or not self.entries:
+                    self.changed.wait()
+                elif not self.changed.wait_for(
+                    lambda: len(self.entries) >= size or not self.entries, timeout
+                ):
+                    return
+
+    def conflict(self, transaction: Transaction) -> tp.Optional[str]:
+        """Return the id of a pending transaction spending an input of the given one."""
+        for output_id in transaction.transaction_inputs:
+            spender = self.spent.get(output_id)
+            if spender is not None and spender != transaction.id:
+                return spender
+
+        return None
+
+    def snapshot(self) -> tp.Tuple[tp.List[Transaction], tp.Optional[str]]:
+        """Return the pending transactions along with their merkle root."""
+        with self.lock:
+            transactions = [transaction for transaction, _ in self.entries.values()]
+
+            if self.tree is None:
+                self.tree = MerkleTree.from_leaf_hashes(
+                    self.leaves[transaction_id] for transaction_id in self.entries
+                )
+
+            return transactions, self.tree.root(len(transactions))
+
+    def make_room(self) -> tp.List[Entry]:
+        """Evict the oldest transactions, and their descendants, until one more fits."""
+        with self.lock:
+            doomed: tp.Set[str] = set()
+
+            # Descendants of the oldest transactions may make room on their own
+            oldest = iter(self.entries)
+            while len(self.entries) - len(doomed) >= self.max_size:
+                self._descendants(next(oldest), doomed)
+
+            evicted = self._remove(doomed)
+            self.counters["evicted"] += len(evicted)
+
+            return evicted
+
+    def add(self, transaction: Transaction, spent: tp.List[UTXO]) -> None:
+        with self.lock:
+            self.entries[transaction.id] = (transaction, spent)
+            for output_id in transaction.transaction_inputs:
+                self.spent[output_id] = transaction.id
+
+            leaf = hash_leaf(transaction.json().encode("utf-8"))
+            self.leaves[transaction.id] = leaf
+            if self.tree is not None:
+                self.tree.append_leaf_hash(leaf)
+
+            self.counters["accepted"] += 1
+
+            self.changed.notify_all()
+
+    def remove(self, transaction_ids: tp.Iterable[str]) -> tp.Set[str]:
+        """Remove mined transactions, returning the ids of those that were pending."""
+        with self.lock:
+            removed = set()
+            for transaction_id in transaction_ids:
+                entry = self.entries.pop(transaction_id, None)
+                if entry is None:
+                    continue
+
+                for output_id in entry[0].transaction_inputs:
+                    self.spent.pop(output_id, None)
+                del self.leaves[transaction_id]
+
+                removed.add(transaction_id)
+
+            if removed:
+                self.tree = None
+                self.changed.notify_all()
+
+            self.counters["mined"] += len(removed)
+
+            return removed
+
+    def discard_conflicts(self, transaction: Transaction) -> tp.List[Entry]:
+        """Drop the transactions double spending a mined one, and their descendants."""
+        with self.lock:
+            conflicts = {
+                self.spent[output_id]
+                for output_id in transaction.transaction_inputs
+                if output_id in self.spent
+            }
+            conflicts.discard(transaction.id)
+
+            doomed: tp.Set[str] = set()
+            for transaction_id in conflicts:
+                self._descendants(transaction_id, doomed)
+
+            entries = self._remove(doomed)
+            self.counters["conflicted"] += len(entries)
+
+            return entries
+
+    def checkpoint(self) -> Checkpoint:
+        """Return the state of the pool, so that changes to it can be rolled back."""
+        with self.lock:
+            return (
+                OrderedDict(self.entries),
+                dict(self.spent),
+                dict(self.leaves),
+                Counter(self.counters),
+            )
+
+    def rollback(self, checkpoint: Checkpoint) -> None:
+        with self.lock:
+            entries, spent, leaves, counters = checkpoint
+
+            self.entries = OrderedDict(entries)
+            self.spent = dict(spent)
+            self.leaves = dict(leaves)
+            self.counters = Counter(counters)
+
+            self.tree = None
+            self.changed.notify_all()
+
+    def clear(self) -> tp.List[Entry]:
+        with self.lock:
+            entries = list(self.entries.values())
+
+            self.entries = OrderedDict()
+            self.spent = {}
+            self.leaves = {}
+            self.tree = MerkleTree()
+
+            self.changed.notify_all()
+
+            return entries
+
+    def _descendants(self, transaction_id: str, doomed: tp.Set[str]) -> None:
+        """Add a transaction and every transaction spending its outputs to `doomed`."""
+        stack = [transaction_id]
+        while stack:
+            transaction_id = stack.pop()
+            if transaction_id in doomed or transaction_id not in self.entries:
+                continue
+
+            doomed.add(transaction_id)
+
+            transaction, _ = self.entries[transaction_id]
+            for output_id, *_ in transaction.transaction_outputs:
+                spender = self.spent.get(output_id)
+                if spender is not None:
+                    stack.append(spender)
+
+    def _remove(self, doomed: tp.Set[str]) -> tp.List[Entry]:
+        """
+        Remove transactions in a single pass, returning them in reverse arrival order,
+        so that undoing them one after the other never undoes a transaction before
+        those depending on it.
+        """
+        if not doomed:
+            return []
+
+        dropped = [
+            self.entries[transaction_id]
+            for transaction_id in reversed(self.entries)
+            if transaction_id in doomed
+        ]
+
+        for transaction, _ in dropped:
+            del self.entries[transaction.id]
+            for output_id in transaction.transaction_inputs:
+                self.spent.pop(output_id, None)
+            del self.leaves[transaction.id]
+
+        self.tree = None
+        self.changed.notify_all()
+
+        return dropped
@@ -0,0 +1,120 @@
+import hashlib
+import typing as tp
+
+EMPTY_ROOT = hashlib.sha256(b"").hexdigest()
+
+
+def hash_leaf(data: bytes) -> bytes:
+    return hashlib.sha256(b"\x00" + data).digest()
+
+
+def hash_node(left: bytes, right: bytes) -> bytes:
+    return hashlib.sha256(b"\x01" + left + right).digest()
+
+
+class MerkleTree:
+    """
+    An append-only Merkle tree. Only complete subtrees are stored, so appending a leaf
+    costs amortized O(1) hashes, while the root or an inclusion proof over any prefix
+    of the leaves costs O(log n). A node without a right sibling is promoted to the
+    level above unchanged, as pairing it with itself would let a list of leaves whose
+    last ones are repeated share the root of the list without them.
+    """
+
+    def __init__(self, leaves: tp.Iterable[bytes] = ()) -> None:
+        self.levels: tp.List[tp.List[bytes]] = [[]]
+
+        for data in leaves:
+            self.append(data)
+
+    def __len__(self) -> int:
+        return len(self.levels[0])
+
+    @classmethod
+    def from_leaf_hashes(cls, hashes: tp.Iterable[bytes]) -> "MerkleTree":
+        """Build a tree out of leaves that have already been hashed by `hash_leaf`."""
+        tree = cls()
+        for node in hashes:
+            tree.append_leaf_hash(node)
+
+        return tree
+
+    def append(self, data: bytes) -> None:
+        self.append_leaf_hash(hash_leaf(data))
+
+    def append_leaf_hash(self, node: bytes) -> None:
+        level = 0
+        while True:
+            self.levels[level].append(node)
+
+            if len(self.levels[level]) % 2 != 0:
+                break
+
+            node = hash_node(*self.levels[level][-2:])
+            level += 1
+
+            if level == len(self.levels):
+                self.levels.append([])
+
+    def root(self, size: tp.Optional[int] = None) -> str:
+        if size is None:
+            size = len(self)
+
+        if size == 0:
+            return EMPTY_ROOT
+
+        height = (size - 1).bit_length()
+
+        return self._node(height, 0, size).hex()
+
+    def proof(
+        self, index: int, size: tp.Optional[int] = None
+    ) -> tp.List[tp.Dict[str, str]]:
+        """
+        Return the sibling hashes on the path from leaf `index` to the root of the tree
+        consisting of the first `size` leaves, along with their position relative to
+        the path.
+        """
+        if size is None:
+            size = len(self)
+
+        proof, level, width = [], 0, size
+        while width > 1:
+            # Promoted nodes have no sibling to be hashed with
+            sibling = index ^ 1
+            if sibling < width:
+                node = self._node(level, sibling, size)
+
+                proof.append(
+                    {
+                        "hash": node.hex(),
+                        "position": "right" if sibling > index else "left",
+                    }
+                )
+
+            index, level, width = index // 2, level + 1, (width + 1) // 2
+
+        return proof
+
+    @staticmethod
+    def verify(data: bytes, proof: tp.List[tp.Dict[str, str]], root: str) -> bool:
+        node = hash_leaf(data)
+        for step in proof:
+            sibling = bytes.fromhex(step["hash"])
+            if step["position"] == "right":
+                node = hash_node(node, sibling)
+            else:
+                node = hash_node(sibling, node)
+
+        return node.hex() == root
+
+    def _node(self, level: int, index: int, size: int) -> bytes:
+        # Complete subtrees are stored, the right edge of the prefix is recomputed
+        if (index + 1) << level <= size:
+            return self.levels[level][index]
+
+        left = self._node(level - 1, 2 * index, size)
+        if (2 * index + 1) << (level - 1) < size:
+            return hash_node(left, self._node(level - 1, 2 * index + 1, size))
+
+        return left
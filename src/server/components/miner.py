@@ -0,0 +1,128 @@
+import hashlib
+import multiprocessing
+import time
+import typing as tp
+
+from components.block import Block
+from loguru import logger
+
+# How many nonces a worker tries before checking whether it should stop
+CHECK_INTERVAL = 1024
+
+_stop_event = None
+
+
+def _initialize(stop_event) -> None:
+    global _stop_event
+
+    _stop_event = stop_event
+
+
+def _search(
+    header: bytes, start: int, step: int, difficulty: int
+) -> tp.Tuple[tp.Optional[int], tp.Optional[str], int, float]:
+    return search(header, start, step, difficulty, _stop_event)
+
+
+def search(
+    header: bytes, start: int, step: int, difficulty: int, stop
+) -> tp.Tuple[tp.Optional[int], tp.Optional[str], int, float]:
+    """
+    Try every `step`-th nonce starting from `start` until either a hash with the
+    required number of leading zeroes is found or `stop` is set by another worker.
+    The header is hashed once and only the nonce is fed to a copy of that state.
+    """
+    state, target = hashlib.sha256(header), "0" * difficulty
+
+    nonce, attempts, now = start, 0, time.perf_counter()
+    while attempts % CHECK_INTERVAL != 0 or not stop.is_set():
+        current_hash = Block.hash_nonce(state, nonce)
+        attempts += 1
+
+        if current_hash.startswith(target):
+            stop.set()
+
+            return nonce, current_hash, attempts, time.perf_counter() - now
+
+        nonce += step
+
+    return None, None, attempts, time.perf_counter() - now
+
+
+class Miner:
+    """
+    A proof-of-work engine splitting the nonce space of a block across a pool of
+    worker processes. Worker `i` out of `n` tries the nonces `i`, `i + n`, `i + 2n`...
+    """
+
+    def __init__(self, n_workers: int = 1) -> None:
+        self.n_workers = max(n_workers, 1)
+        self.stop = multiprocessing.Event()
+
+        self.pool = None
+        if self.n_workers > 1:
+            self.pool = multiprocessing.Pool(
+                self.n_workers, initializer=_initialize, initargs=(self.stop,)
+            )
+
+        self.hashes = [0] * self.n_workers
+        self.elapsed = [0.0] * self.n_workers
+
+    @property
+    def statistics(self) -> tp.List[tp.Dict[str, float]]:
+        return [
+            {
+                "worker": worker,
+                "hashes": self.hashes[worker],
+                "hash_rate": self.hashes[worker] / self.elapsed[worker]
+                if self.elapsed[worker] > 0
+                else 0,
+            }
+            for worker in range(self.n_workers)
+        ]
+
+    def reset(self) -> None:
+        """
+        Arm the engine for a new search. This should happen before reading the chain
+        tip the block is built upon, so that a cancellation is never missed.
+        """
+        self.stop.clear()
+
+    def cancel(self) -> None:
+        """Interrupt the current search, or the next one if none is running."""
+        self.stop.set()
+
+    def mine(self, block: Block, difficulty: int) -> bool:
+        """
+        Search for a nonce that makes the block hash start with `difficulty` zeroes.
+        Returns whether one was found, in which case the block is updated in place,
+        or whether the search was cancelled.
+        """
+        header = block.header()
+        if self.pool is None:
+            results = [search(header, block.nonce, 1, difficulty, self.stop)]
+        else:
+            tasks = [
+                self.pool.apply_async(
+                    _search, (header, block.nonce + worker, self.n_workers, difficulty)
+                )
+                for worker in range(self.n_workers)
+            ]
+            results = [task.get() for task in tasks]
+
+        found = False
+        for worker, (nonce, current_hash, attempts, elapsed) in enumerate(results):
+            self.hashes[worker] += attempts
+            self.elapsed[worker] += elapsed
+
+            logger.info(
+                "Worker {} tried {} nonces ({:.0f} H/s)",
+                worker,
+                attempts,
+                attempts / elapsed if elapsed > 0 else 0,
+            )
+
+            if nonce is not None and not found:
+                block.nonce, block.current_hash, found = nonce, current_hash, True
+
+        return found
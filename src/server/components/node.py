@@ -1,19 +1,38 @@
+import shutil
+import tempfile
 import threading
 import time
 import typing as tp
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
 from datetime import datetime
 from pathlib import Path
 
-from components import Serializable
-from components.block import Block
-from components.blockchain import Blockchain
-from components.transaction import Transaction
+from components import Serializable, crypto
+from components.address import REGISTRY
+from components.batcher import Batcher
+from components.block import Block, BlockHeader
+from components.blockchain import Blockchain, Tip
+from components.index import ChainIndex
+from components.mempool import MEMPOOL_SIZE, Entry, Mempool
+from components.miner import Miner
+from components.snapshot import SNAPSHOT_INTERVAL, Snapshot, SnapshotManager
+from components.store import BlockStore, PackedBlocks
+from components.transaction import Transaction, TransactionBatch
+from components.utxo import UTXO, UTXOSet
+from components.validator import ChainValidator, validate_block
 from components.wallet import Wallet
 from core import http
+from core.locks import SharedLock
+from core.metrics import Registry, timed
 from core.result import Result
+from core.workload import Workload, read_transactions
 from loguru import logger
 from pydantic import Field
 
+# Blocks retrieved from a peer, held until they are adopted
+Staged = tp.Union[BlockStore, PackedBlocks]
+
 
 class Node(Serializable):
     ip: str
@@ -21,52 +40,131 @@ class Node(Serializable):
     capacity: int
     difficulty: int
     n_nodes: int
-    blockchain: Blockchain = Field(default_factory=Blockchain)
+    miners: int = 1
+    validators: int = 1
+    batch_window: float = 0.05
+    batch_size: int = 100
+    blockchain: Blockchain = Field(default_factory=Blockchain.packed)
+    tip: tp.Optional[Tip] = None
     id: tp.Optional[int] = None
     wallet: tp.Optional[Wallet] = None
     wallets: tp.Dict[str, Wallet] = Field(default_factory=dict)
     network: tp.List[tp.Tuple[str, str]] = Field(default_factory=list)
-    pending_transactions: tp.List[Transaction] = Field(default_factory=list)
+    utxos: UTXOSet = Field(default_factory=UTXOSet)
+    mempool_size: int = MEMPOOL_SIZE
+    mempool: tp.Optional[Mempool] = None
+    max_block_wait: tp.Optional[float] = None
+    ready: threading.Event = Field(default_factory=threading.Event)
+    index: ChainIndex = Field(default_factory=ChainIndex)
+    state: SharedLock = Field(default_factory=SharedLock)
+    wallet_lock: tp.Any = Field(default_factory=threading.Lock)
     debug: bool = False
     transactions_filepath: tp.Optional[Path] = None
-    metrics_: tp.Dict[str, tp.Dict[str, float]] = Field(default_factory=dict)
+    data_directory: tp.Optional[Path] = None
+    snapshot_interval: int = SNAPSHOT_INTERVAL
+    workload_rate: tp.Optional[float] = None
+    workload_concurrency: int = 1
+    metrics_: tp.Dict[str, tp.Dict[str, tp.Any]] = Field(default_factory=dict)
+    registry: Registry = Field(default_factory=Registry)
+    miner: tp.Optional[Miner] = None
+    validator: tp.Optional[ChainValidator] = None
+    batcher: tp.Optional[Batcher] = None
+    snapshots: tp.Optional[SnapshotManager] = None
+
+    class Config:
+        arbitrary_types_allowed = True
 
     def __init__(self, **kwargs) -> None:
         super().__init__(**kwargs)
 
+        self.mempool = Mempool(self.mempool_size)
+        self.snapshots = SnapshotManager(
+            lambda: self.blockchain.blocks,
+            directory=None
+            if self.data_directory is None
+            else self.data_directory / "snapshots",
+            interval=self.snapshot_interval,
+        )
+
+        if self.data_directory is not None:
+            self.blockchain = Blockchain.open(self.data_directory)
+
+            logger.info("Restored {} blocks", len(self.blockchain.blocks))
+
+            self.index = ChainIndex(self.blockchain.blocks)
+            self.publish_tip()
+            self.rebuild_state()
+            self.snapshots.resync()
+
+        self.miner = Miner(self.miners)
+        self.validator = ChainValidator(self.validators)
+        self.batcher = Batcher(
+            self.broadcast_transactions, self.batch_window, self.batch_size
+        )
+
+        self.registry.gauge(
+            "mempool_transactions",
+            "The number of pending transactions",
+            lambda: len(self.mempool),
+        )
+        self.registry.gauge(
+            "blockchain_height",
+            "The number of blocks of the chain",
+            lambda: len(self.index),
+        )
+        self.registry.gauge(
+            "hash_rate",
+            "The average hashes per second since startup, summed over all workers",
+            lambda: sum(worker["hash_rate"] for worker in self.miner.statistics),
+        )
+
         threading.Thread(target=self.mining).start()
 
         if self.transactions_filepath is not None:
             threading.Thread(target=self.transmit_transactions).start()
 
     @property
-    def metrics(self) -> tp.Dict[str, float]:
-        n_blocks = len(self.blockchain.blocks)
-
-        transactions = {"successful": 0, "failed": 0, "throughput": 0}
-        try:
-            transactions = self.metrics_["transactions"]
-        except KeyError:
-            pass
+    def metrics(self) -> tp.Dict[str, tp.Any]:
+        transactions = self.metrics_.get(
+            "transactions", {"successful": 0, "failed": 0, "throughput": 0}
+        )
 
         return {
             "transactions": transactions,
             "blocks": {
-                "mining_time": self.metrics_["blocks"]["mining_time"] / n_blocks,
-                "total_time": self.metrics_["blocks"]["total_time"] / n_blocks,
+                "mining_time": self.registry.histogram("block_mining_seconds").mean,
+                "total_time": self.registry.histogram("block_total_seconds").mean,
             },
+            "miners": self.miner.statistics,
+            "caches": Transaction.cache_info(),
+            "mempool": self.mempool.statistics,
+            "metrics": self.registry.to_dict(),
         }
 
     @property
     def is_bootstrap(self) -> bool:
         return self.id == 0
 
+    @property
+    def remote_addresses(self) -> tp.List[str]:
+        return [
+            remote_address
+            for remote_address, public_key in self.network
+            if public_key != self.wallet.public_key
+        ]
+
+    @property
+    def balance(self) -> int:
+        return self.utxos.balance(self.wallet.public_key)
+
     def generate_wallet(self, public_key: str, private_key: str) -> None:
-        if self.debug:
+        # The fixed keys of debug mode are RSA keys
+        if self.debug and crypto.scheme().name == "rsa":
             self.wallet = Wallet(public_key=public_key, private_key=private_key)
         else:
             self.wallet = Wallet.generate_wallet()
 
+        self.wallet.public_key = REGISTRY.register(self.wallet.public_key)
         self.wallets[self.wallet.public_key] = self.wallet
 
         logger.info("Registered wallet address '{}'", self.wallet.public_key)
@@ -83,246 +181,636 @@ class Node(Serializable):
 
         logger.info("Creating transaction")
 
-        counter, i, transaction_inputs = amount, 0, []
-        while counter > 0 and i < len(self.wallet.utxos):
-            id, _, _, transaction_amount = self.wallet.utxos[i]
+        # Transactions of the same wallet would otherwise pick the same inputs
+        with self.wallet_lock:
+            total, transaction_inputs = 0, []
+            for output_id, _, _, output_amount in self.utxos.utxos(
+                self.wallet.public_key
+            ):
+                if total >= amount:
+                    break
 
-            if counter - transaction_amount > 0:
-                transaction_inputs.append(id)
-                counter -= transaction_amount
-            elif counter - transaction_amount == 0:
-                transaction_inputs.append(id)
-                counter = 0
-            else:
-                transaction_inputs.append(id)
-                counter = 0
+                transaction_inputs.append(output_id)
+                total += output_amount
 
-            i += 1
-
-        transaction = Transaction.create_transaction(
-            self.wallet.public_key,
-            recipient_address,
-            amount,
-            transaction_inputs,
-            [],
-            self.wallet.private_key,
-        )
-
-        change = self.wallet.balance - amount
-        transaction.transaction_outputs = [
-            (f"{self.id}:{transaction.id}", transaction.id, recipient_address, amount),
-            (
-                f"{self.id}:{transaction.id}",
-                transaction.id,
+            transaction = Transaction.create_transaction(
                 self.wallet.public_key,
-                change,
-            ),
-        ]
+                recipient_address,
+                amount,
+                transaction_inputs,
+                [],
+                self.wallet.private_key,
+            )
 
-        result = self.validate_transaction(transaction)
-        if not result:
-            return result
+            change = total - amount
+            transaction.transaction_outputs = [
+                (f"{transaction.id}:0", transaction.id, recipient_address, amount),
+                (f"{transaction.id}:1", transaction.id, self.wallet.public_key, change),
+            ]
 
-        self.persist_transaction(transaction)
+            result = self.validate_transaction(transaction)
+            if not result:
+                return result
+
+            result = self.persist_transaction(transaction)
+            if not result:
+                return result
 
         self.broadcast_transaction(transaction)
 
-        return Result.ok()
+        return Result.ok(transaction)
 
     def calculate_change(self, transaction: Transaction) -> int:
-        wallet = self.wallets[transaction.sender_address]
-
         total = 0
-        for utxo in wallet.utxos:
-            if utxo[0] in transaction.transaction_inputs:
-                total += utxo[3]
+        for output_id in transaction.transaction_inputs:
+            total += self.utxos.get(output_id)[3]
 
         return total - transaction.amount
 
+    @timed("transaction_validation_seconds", "Time spent validating a transaction")
     def validate_transaction(self, transaction: Transaction) -> Result:
         logger.info("Validating transaction {}", transaction.id)
 
-        if not transaction.verify_signature():
+        with self.registry.histogram(
+            "signature_verification_seconds",
+            "Time spent verifying the signature of a transaction",
+        ).time():
+            valid = transaction.verify_signature()
+
+        if not valid:
             return Result.invalid(f"Invalid transaction signature {transaction.id}")
 
-        if self.calculate_change(transaction) < 0:
+        inputs = transaction.transaction_inputs
+        if len(set(inputs)) != len(inputs):
+            return Result.invalid(f"Duplicate transaction inputs {transaction.id}")
+
+        for output_id in inputs:
+            utxo = self.utxos.get(output_id)
+            if utxo is None or utxo[2] != transaction.sender_address:
+                return Result.invalid(
+                    f"Invalid transaction input {output_id} of {transaction.id}"
+                )
+
+        change = self.calculate_change(transaction)
+        if transaction.amount <= 0 or change < 0:
             return Result.invalid(f"Invalid transaction amount {transaction.id}")
 
+        # Outputs are not signed, so every one of their fields is checked
+        outputs = [
+            (f"{transaction.id}:{i}", transaction.id, address, amount)
+            for i, (address, amount) in enumerate(
+                [
+                    (transaction.recipient_address, transaction.amount),
+                    (transaction.sender_address, change),
+                ]
+            )
+        ]
+        if [tuple(o) for o in transaction.transaction_outputs] != outputs:
+            return Result.invalid(f"Invalid transaction outputs {transaction.id}")
+
         return Result.ok()
 
-    def persist_transaction(self, transaction: Transaction) -> None:
+    def receive_transaction(self, transaction: Transaction) -> Result:
+        if (
+            transaction.id in self.mempool
+            or self.index.locate(transaction.id) is not None
+        ):
+            self.mempool.reject("duplicate")
+            return Result.conflict(f"Duplicate transaction {transaction.id}")
+
+        spender = self.mempool.conflict(transaction)
+        if spender is not None:
+            self.mempool.reject("double_spend")
+            return Result.conflict(
+                f"Transaction {transaction.id} double spends pending {spender}"
+            )
+
+        result = self.validate_transaction(transaction)
+        if not result:
+            self.mempool.reject("invalid")
+            return result
+
+        return self.persist_transaction(transaction)
+
+    def persist_transaction(self, transaction: Transaction) -> Result:
         logger.info("Persisting transaction {}", transaction.id)
-        self.update_wallets(transaction)
 
-        self.pending_transactions.append(transaction)
+        # Evicted transactions involve other addresses, so they are undone exclusively
+        if self.mempool.full:
+            with self.state.exclusive():
+                self.revert_transactions(self.mempool.make_room())
+
+        with self.state.shared(), self.utxos.locked(transaction):
+            # The same transaction may have been received concurrently
+            if transaction.id in self.mempool:
+                self.mempool.reject("duplicate")
+                return Result.conflict(f"Duplicate transaction {transaction.id}")
+
+            # The transaction may have depended on an evicted or concurrent one
+            try:
+                spent = self.update_wallets(transaction)
+            except KeyError as e:
+                self.mempool.reject("evicted_input")
+                return Result.invalid(str(e))
 
-    def update_wallets(self, transaction: Transaction) -> None:
-        wallet = self.wallets[transaction.recipient_address]
-        wallet.utxos.append(transaction.transaction_outputs[0])
+            self.mempool.add(transaction, spent)
 
-        wallet = self.wallets[transaction.sender_address]
+        self.check_ready()
+
+        return Result.ok()
 
-        i = 0
-        while i < len(wallet.utxos):
-            if wallet.utxos[i][0] in transaction.transaction_inputs:
-                del wallet.utxos[i]
+    def update_wallets(self, transaction: Transaction) -> tp.List[UTXO]:
+        return self.utxos.apply(transaction)
 
-            i += 1
+    def revert_transactions(self, entries: tp.List[Entry]) -> None:
+        for transaction, spent in entries:
+            logger.info("Dropping pending transaction {}", transaction.id)
 
-        wallet.utxos.append(transaction.transaction_outputs[1])
+            self.utxos.revert(transaction, spent)
 
     def broadcast_transaction(self, transaction: Transaction) -> None:
         logger.info("Broadcasting transaction {}", transaction.id)
 
-        for remote_address, _ in self.network[: self.id] + self.network[self.id + 1 :]:
-            logger.info(
-                "Transmitting transaction {} to {}", transaction.id, remote_address
-            )
+        self.batcher.add(transaction)
+
+    @timed("transaction_broadcast_seconds", "Time spent broadcasting a batch")
+    def broadcast_transactions(self, transactions: tp.List[Transaction]) -> None:
+        logger.info("Broadcasting batch of {} transactions", len(transactions))
 
-            http.post(f"{remote_address}/transactions/broadcast", transaction)
+        http.broadcast(
+            [
+                f"{remote_address}/transactions/broadcast/batch"
+                for remote_address in self.remote_addresses
+            ],
+            TransactionBatch(transactions=transactions),
+        )
 
     def view_transactions(self) -> tp.List[Transaction]:
+        tip = self.tip
+        transactions = tip.block.transactions if tip is not None else []
+
         if self.debug:
-            return self.blockchain.blocks[-1].transactions + self.pending_transactions
+            return transactions + list(self.mempool)
 
-        return self.blockchain.blocks[-1].transactions
+        return transactions
 
     def mining(self):
-        self.metrics_["blocks"] = {"mining_time": 0, "total_time": 0}
-
         while True:
-            if len(self.pending_transactions) < self.capacity:
-                time.sleep(5)
-                continue
+            self.mempool.wait(self.capacity, self.max_block_wait)
 
             now = time.time()
 
+            self.miner.reset()
+
+            tip = self.tip
+            transactions, merkle_root = self.mempool.snapshot()
             block = Block(
-                index=len(self.blockchain.blocks),
+                index=tip.height,
                 timestamp=datetime.utcnow(),
                 nonce=0,
-                previous_hash=self.blockchain.blocks[-1].current_hash,
-                transactions=self.pending_transactions,
+                previous_hash=tip.block.current_hash,
+                transactions=transactions,
+                merkle_root=merkle_root,
             )
 
             logger.info("Mining block {}", block.index)
-            self.mine_block(block)
+            if not self.mine_block(block):
+                logger.info("Abandoned block {} for a new chain tip", block.index)
+                self.registry.counter(
+                    "blocks_abandoned_total", "Blocks abandoned for a new chain tip"
+                ).inc()
+                continue
             logger.info("Finished mining block {}", block.index)
 
-            self.metrics_["blocks"]["mining_time"] += time.time() - now
+            self.registry.counter("blocks_mined_total", "Blocks mined").inc()
+            self.registry.histogram(
+                "block_mining_seconds", "Time spent mining a block successfully"
+            ).observe(time.time() - now)
 
             result = self.validate_block(block)
+            if result:
+                result = self.persist_block(block)
+
             if not result:
                 logger.error(result.error.message)
                 continue
 
-            self.persist_block(block)
             self.broadcast_block(block)
 
-            self.metrics_["blocks"]["total_time"] += time.time() - now
+            self.registry.histogram(
+                "block_total_seconds",
+                "Time spent mining, validating and broadcasting a block",
+            ).observe(time.time() - now)
 
-    def mine_block(self, block: Block):
+    @timed("mining_attempt_seconds", "Time spent on an attempt to mine a block")
+    def mine_block(self, block: Block) -> bool:
         """
         Mine a new block by finding a nonce that makes the block hash start with a certain
         number of zeroes determined by the difficulty constant.
         """
-        # Keep trying different values of the nonce until the block hash starts with
-        # the required number of zeroes
-        target, current_hash = "0" * self.difficulty, Block.calculate_hash(block)
-        while not current_hash.startswith(target):
-            block.nonce += 1
-            current_hash = Block.calculate_hash(block)
-
-        block.current_hash = current_hash
+        return self.miner.mine(block, self.difficulty)
 
+    @timed("block_validation_seconds", "Time spent validating a block")
     def validate_block(self, block: Block, previous_block: tp.Optional[Block] = None):
         if previous_block is None:
-            previous_block = self.blockchain.blocks[-1]
+            previous_block = self.tip.block
+
+        return validate_block(block, previous_block.current_hash)
+
+    def persist_block(self, block: Block) -> Result:
+        # Transactions being persisted are let through before the block is applied
+        with self.state.exclusive():
+            # Another block may have extended the chain since this one was validated
+            if block.previous_hash != self.tip.block.current_hash:
+                return Result.conflict(f"Block {block.index} no longer extends the tip")
+
+            # The block is undone as a whole if any of its transactions is invalid
+            checkpoint = self.mempool.checkpoint()
+            applied: tp.List[Entry] = []
+            discarded: tp.List[Entry] = []
+
+            # Only the included transactions leave the pool, having already been applied
+            pending = self.mempool.remove(
+                transaction.id for transaction in block.transactions
+            )
+
+            # Transactions still buffered by their sender are seen for the first time
+            for transaction in block.transactions:
+                if transaction.id in pending:
+                    continue
+
+                # Pending transactions double spending the mined ones are dropped
+                conflicts = self.mempool.discard_conflicts(transaction)
+                self.revert_transactions(conflicts)
+                discarded += conflicts
+
+                result = self.validate_transaction(transaction)
+                if result:
+                    try:
+                        applied.append((transaction, self.update_wallets(transaction)))
+                    except KeyError as e:
+                        result = Result.invalid(str(e))
+
+                if not result:
+                    for applied_transaction, spent in reversed(applied):
+                        self.utxos.revert(applied_transaction, spent)
 
-        # Check if block's current hash is correct
-        block_hash = Block.calculate_hash(block)
-        if block_hash != block.current_hash:
-            return Result.invalid(f"Block {block.index} has incorrect hash")
+                    # Dropped transactions were undone most recent first
+                    for discarded_transaction, _ in reversed(discarded):
+                        self.update_wallets(discarded_transaction)
 
-        # Check if block's previous hash is equal to hash of previous block
-        if block.previous_hash != previous_block.current_hash:
-            return Result.invalid(f"Block {block.index} previous hash mismatch")
+                    self.mempool.rollback(checkpoint)
+
+                    return Result.invalid(
+                        f"Block {block.index} includes an invalid transaction "
+                        f"[{result.error.message}]"
+                    )
+
+            # Any block being mined on top of the previous tip is now stale
+            self.miner.cancel()
+
+            self.append_block(block)
+
+        self.check_ready()
 
         return Result.ok()
 
-    def persist_block(self, block: Block):
-        self.pending_transactions.clear()
+    def append_block(self, block: Block) -> None:
         self.blockchain.blocks.append(block)
+        self.index.append(block)
+        self.snapshots.add(block)
+
+        self.publish_tip()
 
+    def publish_tip(self) -> None:
+        """
+        Replace the chain tip, which is read without any locking and thus always
+        swapped for a new one rather than updated in place.
+        """
+        blocks = self.blockchain.blocks
+        self.tip = Tip(len(blocks), blocks[-1]) if blocks else None
+
+    @timed("block_broadcast_seconds", "Time spent broadcasting a block")
     def broadcast_block(self, block: Block):
+        # Peers should have received the transactions of the block beforehand
+        self.batcher.flush()
+
         logger.info("Broadcasting block {}", block.index)
 
-        for remote_address, _ in self.network[: self.id] + self.network[self.id + 1 :]:
-            logger.info("Transmitting block {} to {}", block.index, remote_address)
+        http.broadcast(
+            [
+                f"{remote_address}/blocks/broadcast"
+                for remote_address in self.remote_addresses
+            ],
+            block,
+        )
 
-            http.post(f"{remote_address}/blocks/broadcast", block)
+    def prove_transaction(self, index: int, transaction_id: str) -> Result:
+        if not 0 <= index < len(self.blockchain.blocks):
+            return Result.not_found(f"Unknown block {index}")
+
+        location = self.index.locate(transaction_id)
+        if location is None or location[0] != index:
+            return Result.not_found(
+                f"Transaction {transaction_id} is not included in block {index}"
+            )
+
+        _, position = location
+
+        block = self.blockchain.blocks[index]
+        transaction = block.transactions[position]
+
+        tree = Block.merkle_tree(block.transactions)
+
+        return Result.ok(
+            {
+                "index": index,
+                "merkle_root": block.merkle_root,
+                "transaction": transaction.json(),
+                "proof": tree.proof(position),
+            }
+        )
 
     def validate_chain(self, blockchain: Blockchain) -> Result:
-        for i in range(1, len(blockchain.blocks)):
-            previous_block = blockchain.blocks[i - 1]
-            current_block = blockchain.blocks[i]
+        return self.validator.validate(blockchain.blocks)
 
-            result = self.validate_block(current_block, previous_block)
-            if not result:
-                return result
+    def find_block(self, block_hash: str) -> Result:
+        height = self.index.height(block_hash)
+        if height is None:
+            return Result.not_found(f"Unknown block {block_hash}")
 
-        return Result.ok()
+        return Result.ok(self.blockchain.blocks[height])
+
+    def find_transaction(self, transaction_id: str) -> Result:
+        location = self.index.locate(transaction_id)
+        if location is None:
+            return Result.not_found(f"Unknown transaction {transaction_id}")
+
+        height, position = location
+
+        block = self.blockchain.blocks[height]
+
+        return Result.ok(
+            {
+                "index": height,
+                "position": position,
+                "block_hash": block.current_hash,
+                "transaction": block.transactions[position].json(),
+            }
+        )
+
+    def common_height(self, blocks: tp.Sequence[Block]) -> int:
+        """Return the number of leading blocks a chain shares with ours."""
+        height = min(len(self.index), len(blocks))
+        while height > 0 and self.index.height(blocks[height - 1].current_hash) != (
+            height - 1
+        ):
+            height -= 1
+
+        return height
+
+    def replace_chain(
+        self,
+        height: int,
+        blocks: tp.Sequence[Block],
+        snapshot: tp.Optional[Snapshot] = None,
+    ) -> None:
+        """Replace every block from `height` onwards with the given ones."""
+        # Any block being mined on top of the previous tip is now stale
+        self.miner.cancel()
+
+        self.index.truncate(height)
+        for block in blocks:
+            self.index.append(block)
+
+        ours = self.blockchain.blocks
+        if isinstance(ours, (BlockStore, PackedBlocks)):
+            ours.truncate(height)
+            for block in blocks:
+                ours.append(block)
+
+            ours.sync()
+        else:
+            self.blockchain = Blockchain.construct(blocks=ours[:height] + list(blocks))
+
+        self.publish_tip()
+
+        self.snapshots.resync(snapshot)
+
+    def rebuild_state(self, snapshot: tp.Optional[Snapshot] = None) -> None:
+        """
+        Recompute the unspent outputs by replaying the chain on top of its latest
+        snapshot, keeping the pending transactions that are still valid.
+        """
+        pending = [transaction for transaction, _ in self.mempool.clear()]
+
+        blocks = self.blockchain.blocks
+        if snapshot is None or not snapshot.matches(blocks):
+            snapshot = self.snapshots.latest(blocks)
+
+        utxos = UTXOSet(snapshot.utxos if snapshot is not None else ())
+
+        for block in blocks[snapshot.height if snapshot is not None else 0 :]:
+            for transaction in block.transactions:
+                try:
+                    utxos.apply(transaction)
+                except KeyError as e:
+                    logger.error("Skipping transaction {} [{}]", transaction.id, e)
+
+        # Balances are read without locking, so the set is only swapped in once complete
+        self.utxos = utxos
+
+        for transaction in pending:
+            if self.index.locate(transaction.id) is None and self.validate_transaction(
+                transaction
+            ):
+                self.persist_transaction(transaction)
 
     def resolve_conflict(self) -> None:
         logger.info("Resolving conflict")
 
-        longest_block_chain = self.blockchain
-
-        # Find the longest chain from all the neighboring nodes
-        max_length = len(longest_block_chain.blocks)
-        for remote_address, _ in self.network[: self.id] + self.network[self.id + 1 :]:
-            logger.info("Retrieving blockchain from {}", remote_address)
+        def survey(remote_address: str) -> tp.Optional[tp.Tuple[int, int, str]]:
+            """
+            Stream the headers of a neighboring chain, returning its length and the
+            height up to which it agrees with ours.
+            """
+            logger.info("Retrieving block headers from {}", remote_address)
+
+            length, fork, previous_hash = 0, None, None
+            for header in http.stream(
+                f"{remote_address}/blockchain/?headers=true", BlockHeader
+            ):
+                if (
+                    header.index != length
+                    # Headers missing any of the hashed fields cannot be hashed
+                    or header.previous_hash is None
+                    or header.merkle_root is None
+                    or (length > 0 and header.previous_hash != previous_hash)
+                    or Block.calculate_hash(header) != header.current_hash
+                ):
+                    logger.error("Invalid header {} from {}", length, remote_address)
+                    return None
+
+                if fork is None and self.index.height(header.current_hash) != length:
+                    fork = length
+
+                length, previous_hash = length + 1, header.current_hash
+
+            # Only chains longer than ours are worth retrieving, which a chain that
+            # agrees with ours throughout is not, even if ours grew in the meantime
+            if fork is None or length <= len(self.index):
+                return None
+
+            return length, fork, remote_address
+
+        def retrieve(fork: int, remote_address: str, staged: Staged) -> bool:
+            """
+            Stream the blocks of a neighboring chain past the fork point, validating
+            them in batches that keep every validator busy and staging the valid ones.
+            """
+            logger.info(
+                "Retrieving blocks from {} onwards from {}", fork, remote_address
+            )
 
-            response = http.get(f"{remote_address}/blockchain/")
+            batch_size = self.validator.chunk_size * self.validator.n_workers
+
+            # The first retrieved block has to extend the last block we agree on
+            previous = self.blockchain.blocks[fork - 1 : fork] if fork > 0 else []
+
+            def commit(batch: tp.List[Block]) -> bool:
+                nonlocal previous
+
+                result = self.validator.validate(previous + batch)
+                if not result:
+                    logger.error(result.error.message)
+                    return False
+
+                for block in batch:
+                    staged.append(block)
+
+                previous = batch[-1:]
+
+                return True
+
+            batch: tp.List[Block] = []
+            for block in http.stream(
+                f"{remote_address}/blockchain/?from={fork}", Block
+            ):
+                if block.index != fork + len(staged) + len(batch):
+                    logger.error("Non-consecutive blocks from {}", remote_address)
+                    return False
+
+                batch.append(block)
+                if len(batch) == batch_size:
+                    if not commit(batch):
+                        return False
+
+                    batch = []
+
+            if batch and not commit(batch):
+                return False
+
+            return fork + len(staged) > len(self.blockchain.blocks)
+
+        # Survey the chains of all the neighboring nodes concurrently
+        remote_addresses = self.remote_addresses
+        with ThreadPoolExecutor(max_workers=max(len(remote_addresses), 1)) as executor:
+            candidates = [
+                candidate
+                for candidate in executor.map(survey, remote_addresses)
+                if candidate is not None
+            ]
+
+        with ExitStack() as stack:
+            staging = {
+                remote_address: stack.enter_context(self.staging())
+                for _, _, remote_address in candidates
+            }
+
+            # Retrieve and validate the blocks past the fork point of every longer
+            # chain concurrently, and adopt the longest valid one
+            with ThreadPoolExecutor(max_workers=max(len(candidates), 1)) as executor:
+                valid = [
+                    (fork + len(staging[remote_address]), fork, remote_address)
+                    for (_, fork, remote_address), retrieved in zip(
+                        candidates,
+                        executor.map(
+                            lambda candidate: retrieve(
+                                candidate[1], candidate[2], staging[candidate[2]]
+                            ),
+                            candidates,
+                        ),
+                    )
+                    if retrieved
+                ]
+
+            for _, fork, remote_address in sorted(valid, reverse=True):
+                suffix = staging[remote_address]
+
+                with self.state.exclusive():
+                    # The chain may have changed while the blocks were being retrieved
+                    if fork + len(suffix) <= len(self.index) or (
+                        fork > 0
+                        and self.index.height(suffix[0].previous_hash) != fork - 1
+                    ):
+                        continue
+
+                    self.replace_chain(fork, suffix)
+                    self.rebuild_state()
+
+                return
+
+    @contextmanager
+    def staging(self) -> tp.Iterator[Staged]:
+        """
+        Hold the blocks retrieved from a peer until they are adopted, on disk if the
+        chain is persisted and binary-encoded in memory otherwise.
+        """
+        if self.data_directory is None:
+            yield PackedBlocks()
+            return
 
-            payload = response.json()
-            blockchain = Blockchain.from_json(payload)
-            length = len(blockchain.blocks)
+        root = self.data_directory / "staging"
+        root.mkdir(parents=True, exist_ok=True)
 
-            # Check if the length is longer and the chain is valid
-            if self.validate_chain(blockchain) and length > max_length:
-                max_length, longest_block_chain = length, blockchain
+        directory = Path(tempfile.mkdtemp(dir=root))
+        store = BlockStore(directory)
+        try:
+            yield store
+        finally:
+            store.close()
+            shutil.rmtree(directory, ignore_errors=True)
 
-        # Replace the current blockchain with the new blockchain if it is longer and valid
-        self.blockchain = longest_block_chain
+    def check_ready(self) -> None:
+        """Start the workload once the network is complete and the wallet is funded."""
+        if len(self.network) == self.n_nodes and self.balance > 0:
+            self.ready.set()
 
     def transmit_transactions(self):
-        while len(self.network) < self.n_nodes:
-            time.sleep(1)
-
-        self.metrics_["transactions"] = {"successful": 0, "failed": 0, "throughput": 0}
+        self.ready.wait()
 
         logger.info("Reading transaction file {}", self.transactions_filepath)
 
-        now = time.time()
-        with self.transactions_filepath.open("r") as file:
-            for node_id, amount in map(str.split, file.readlines()):
-                node_id, amount = int(node_id[2:]), int(amount)
-                _, receiver_address = self.network[node_id]
+        def submit(node_id: int, amount: int) -> tp.Optional[str]:
+            _, receiver_address = self.network[node_id]
 
-                result = self.create_transaction(receiver_address, amount)
-                if result:
-                    self.metrics_["transactions"]["successful"] += 1
-                else:
-                    self.metrics_["transactions"]["failed"] += 1
+            result = self.create_transaction(receiver_address, amount)
 
-        elapsed = time.time() - now
+            return result.payload.id if result else None
 
-        n_successful_transactions = self.metrics_["transactions"]["successful"]
-        n_failed_transactions = self.metrics_["transactions"]["failed"]
-        n_transactions = n_successful_transactions + n_failed_transactions
+        workload = Workload(
+            submit,
+            lambda transaction_id: self.index.locate(transaction_id) is not None,
+            rate=self.workload_rate,
+            concurrency=self.workload_concurrency,
+            registry=self.registry,
+        )
 
-        self.metrics_["transactions"]["throughput"] = n_transactions / elapsed
+        # The counters are updated in place while the workload is running
+        self.metrics_["transactions"] = workload.counters
+        self.metrics_["transactions"] = workload.run(
+            read_transactions(self.transactions_filepath)
+        )
 
         logger.info("Finished reading file {}", self.transactions_filepath)
 
@@ -331,6 +819,7 @@ class EnrollRequest(Serializable):
     network: tp.List[tp.Tuple[str, str]]
     blockchain: Blockchain
     wallets: tp.List[Wallet]
+    snapshot: tp.Optional[Snapshot] = None
 
 
 class Bootstrap(Node):
@@ -344,6 +833,14 @@ class Bootstrap(Node):
 
         self.network.append((f"http://{self.ip}:{self.port}", self.wallet.public_key))
 
+        # There are no peers to fund in a single node network
+        if len(self.network) == self.n_nodes:
+            self.ready.set()
+
+        # A restored chain already starts with its genesis block
+        if self.blockchain.blocks:
+            return
+
         transaction = Transaction.create_transaction(
             "0",
             self.wallet.public_key,
@@ -355,17 +852,15 @@ class Bootstrap(Node):
 
         transaction.transaction_outputs = [
             (
-                f"{self.id}:{transaction.id}",
+                f"{transaction.id}:0",
                 transaction.id,
                 self.wallet.public_key,
                 100 * self.n_nodes,
             ),
-            (f"{self.id}:{transaction.id}", transaction.id, "0", 0),
+            (f"{transaction.id}:1", transaction.id, "0", 0),
         ]
 
-        self.wallet.utxos = [
-            transaction.transaction_outputs[0],
-        ]
+        self.update_wallets(transaction)
 
         genesis_block = Block(
             index=0,
@@ -375,70 +870,91 @@ class Bootstrap(Node):
             transactions=[transaction],
         )
 
+        genesis_block.merkle_root = Block.merkle_tree(genesis_block.transactions).root()
+
         genesis_block.current_hash = Block.calculate_hash(genesis_block)
 
-        self.blockchain.blocks.append(genesis_block)
+        self.append_block(genesis_block)
 
     def enroll(self, remote_address: str, public_key: str) -> int:
         logger.info("Registering {}", remote_address)
 
+        # The addresses of participants are shared by every transaction decoded later
+        public_key = REGISTRY.register(public_key)
+
         self.network.append((remote_address, public_key))
         self.wallets[public_key] = Wallet(public_key=public_key, utxos=[])
 
         if len(self.network) == self.n_nodes:
-            for remote_address, public_key in self.network[1:]:
-                logger.info("Enrolling {}", remote_address)
-
-                http.post(
-                    f"{remote_address}/nodes/enroll",
+            logger.info("Enrolling {} peers", len(self.network) - 1)
+
+            with self.registry.histogram(
+                "enroll_broadcast_seconds", "Time spent enrolling the peers"
+            ).time():
+                http.broadcast(
+                    [
+                        f"{remote_address}/nodes/enroll"
+                        for remote_address, _ in self.network[1:]
+                    ],
                     EnrollRequest(
                         network=self.network,
                         blockchain=self.blockchain,
-                        wallets=list(self.wallets.values()),
+                        wallets=[
+                            Wallet(public_key=address) for address in self.wallets
+                        ],
+                        snapshot=self.snapshots.capture(),
                     ),
                 )
 
-            time.sleep(5)
-
+            # Every peer has acknowledged its enrollment by now
             for remote_address, public_key in self.network[1:]:
                 self.create_transaction(public_key, 100)
 
+            self.ready.set()
+
         return len(self.network) - 1
 
-    def gather_metrics(self) -> tp.Dict[str, tp.Dict[str, float]]:
-        global_metrics = {
-            "transactions": {
-                "total_successful": 0,
-                "total_failed": 0,
-                "average_throughput": 0,
-            },
-            "blocks": {"average_mining_time": 0, "average_total_time": 0},
-        }
+    def check_ready(self) -> None:
+        # The coins of the bootstrap node are reserved for funding the peers
+        pass
 
-        for remote_address, _ in self.network[: self.id] + self.network[self.id + 1 :]:
-            logger.info("Gathering metrics for {}", remote_address)
+    def gather_metrics(self) -> tp.Dict[str, tp.Any]:
+        reports = [self.metrics]
 
-            response = http.get(f"{remote_address}/metrics/")
-            local_metrics = response.json()
+        responses = http.gather(
+            [f"{remote_address}/metrics/" for remote_address in self.remote_addresses]
+        )
+        for remote_address, response in zip(self.remote_addresses, responses):
+            if response is None or response.status_code != 200:
+                logger.error("Failed to gather metrics for {}", remote_address)
+                continue
 
-            global_metrics["transactions"]["total_successful"] += local_metrics[
-                "transactions"
-            ]["successful"]
-            global_metrics["transactions"]["total_failed"] += local_metrics[
-                "transactions"
-            ]["failed"]
-            global_metrics["transactions"]["average_throughput"] += (
-                local_metrics["transactions"]["throughput"] / self.n_nodes
-            )
+            reports.append(response.json())
 
-            global_metrics["blocks"]["average_mining_time"] += (
-                local_metrics["blocks"]["mining_time"] / self.n_nodes
-            )
-            global_metrics["blocks"]["average_total_time"] += (
-                local_metrics["blocks"]["total_time"] / self.n_nodes
-            )
+        # Histograms are merged bucket by bucket rather than averaging their means
+        registry = Registry()
+        for report in reports:
+            registry.merge(Registry.from_dict(report["metrics"]))
 
-        return global_metrics
+        return {
+            "transactions": {
+                "total_successful": sum(
+                    report["transactions"]["successful"] for report in reports
+                ),
+                "total_failed": sum(
+                    report["transactions"]["failed"] for report in reports
+                ),
+                "average_throughput": sum(
+                    report["transactions"]["throughput"] for report in reports
+                )
+                / len(reports),
+            },
+            "blocks": {
+                "average_mining_time": registry.histogram("block_mining_seconds").mean,
+                "average_total_time": registry.histogram("block_total_seconds").mean,
+            },
+            "metrics": registry.to_dict(),
+        }
 
 
 class Peer(Node):
@@ -462,6 +978,10 @@ class Peer(Node):
             f"{self.bootstrap_address}/nodes/register",
             {"port": self.port, "public_key": self.wallet.public_key},
         )
+        if response is None or response.status_code != 200:
+            logger.error("Failed to register with {}", self.bootstrap_address)
+            return
+
         payload = response.json()
 
         self.id = payload["id"]
@@ -473,17 +993,34 @@ class Peer(Node):
         network: tp.List[tp.Tuple[str, str]],
         blockchain: Blockchain,
         wallets: tp.List[Wallet],
+        snapshot: tp.Optional[Snapshot] = None,
     ) -> Result:
         result = self.validate_chain(blockchain)
         if not result:
             return result
 
-        self.network = network
-        self.blockchain = blockchain
+        if snapshot is not None and not snapshot.matches(blockchain.blocks):
+            return Result.invalid(
+                f"Snapshot of block {snapshot.height} is not on chain"
+            )
+
+        self.network = [
+            (remote_address, REGISTRY.register(public_key))
+            for remote_address, public_key in network
+        ]
+
+        with self.state.exclusive():
+            height = self.common_height(blockchain.blocks)
+            self.replace_chain(height, blockchain.blocks[height:], snapshot)
+            self.rebuild_state(snapshot)
+
         for wallet in wallets:
+            wallet.public_key = REGISTRY.register(wallet.public_key)
             if wallet.public_key != self.wallet.public_key:
                 self.wallets[wallet.public_key] = wallet
 
         logger.info("Node {} received network and blockchain", self.id)
 
+        self.check_ready()
+
         return Result.ok()
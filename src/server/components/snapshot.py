@@ -0,0 +1,216 @@
+import os
+import queue
+import threading
+import typing as tp
+from pathlib import Path
+
+from components import Serializable
+from components.block import Block
+from components.transaction import decode_output, encode_output
+from components.utxo import UTXO, UTXOSet
+from core.codec import Reader, Writer
+from loguru import logger
+from pydantic import Field
+
+# The number of blocks between consecutive snapshots
+SNAPSHOT_INTERVAL = 100
+
+# The number of most recent snapshots retained
+KEEP = 2
+
+
+class Snapshot(Serializable):
+    """The unspent outputs after applying the first `height` blocks of a chain."""
+
+    height: int
+    block_hash: tp.Optional[str] = None
+    utxos: tp.List[UTXO] = Field(default_factory=list)
+
+    def matches(self, blocks: tp.Sequence[Block]) -> bool:
+        """Whether the snapshot was taken on (a prefix of) the given chain."""
+        if self.height == 0:
+            return True
+
+        return (
+            self.height <= len(blocks)
+            and blocks[self.height - 1].current_hash == self.block_hash
+        )
+
+    def encode(self, writer: Writer) -> None:
+        writer.uvarint(self.height)
+        writer.string(self.block_hash)
+        writer.sequence(self.utxos, lambda utxo: encode_output(writer, utxo))
+
+    @classmethod
+    def decode(cls, reader: Reader) -> "Snapshot":
+        return cls.construct(
+            height=reader.uvarint(),
+            block_hash=reader.string(),
+            utxos=reader.sequence(lambda: decode_output(reader)),
+        )
+
+
+class SnapshotManager:
+    """
+    Maintains the unspent outputs confirmed by the chain on a background thread, which
+    is fed every block appended to it, and checkpoints them every `interval` blocks.
+    Snapshots are kept in memory and, given a directory, written to disk as well, so
+    that rebuilding the state of a node only involves replaying the blocks after the
+    latest snapshot of its chain.
+    """
+
+    def __init__(
+        self,
+        blocks: tp.Callable[[], tp.Sequence[Block]],
+        directory: tp.Optional[Path] = None,
+        interval: int = SNAPSHOT_INTERVAL,
+        keep: int = KEEP,
+    ) -> None:
+        self.blocks = blocks
+        self.directory = directory
+        self.interval = max(interval, 1)
+        self.keep = max(keep, 1)
+
+        self.lock = threading.Lock()
+        self.queue = queue.Queue()
+
+        self.utxos = UTXOSet()
+        self.height = 0
+        self.block_hash: tp.Optional[str] = None
+
+        self.snapshots: tp.List[Snapshot] = []
+        if self.directory is not None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+
+            self.snapshots = self._load()
+
+        threading.Thread(target=self.run, daemon=True).start()
+
+    def _path(self, height: int) -> Path:
+        return self.directory / f"{height:012d}.snapshot"
+
+    def _load(self) -> tp.List[Snapshot]:
+        snapshots = []
+        for path in sorted(self.directory.glob("*.snapshot"))[-self.keep :]:
+            try:
+                snapshots.append(Snapshot.from_bytes(path.read_bytes()))
+            except (ValueError, IndexError) as e:
+                logger.error("Skipping corrupt snapshot {} [{}]", path, e)
+
+        return snapshots
+
+    def latest(self, blocks: tp.Sequence[Block]) -> tp.Optional[Snapshot]:
+        """Return the most recent snapshot taken on the given chain, if any."""
+        with self.lock:
+            snapshots = self.snapshots[::-1]
+
+        for snapshot in snapshots:
+            if snapshot.matches(blocks):
+                return snapshot
+
+        return None
+
+    def capture(self) -> Snapshot:
+        """Return a snapshot of the outputs confirmed so far."""
+        with self.lock:
+            return Snapshot.construct(
+                height=self.height,
+                block_hash=self.block_hash,
+                utxos=list(self.utxos),
+            )
+
+    def add(self, block: Block) -> None:
+        self.queue.put(block)
+
+    def resync(self, snapshot: tp.Optional[Snapshot] = None) -> None:
+        """Rebuild the confirmed outputs after the chain has been replaced."""
+        if snapshot is not None and snapshot.height > 0:
+            self._keep(snapshot)
+
+        self.queue.put(None)
+
+    def run(self) -> None:
+        while True:
+            block = self.queue.get()
+
+            try:
+                # The block has already been replayed while resyncing
+                if block is not None and block.index < self.height:
+                    continue
+
+                if (
+                    block is not None
+                    and block.index == self.height
+                    and (self.height == 0 or block.previous_hash == self.block_hash)
+                ):
+                    with self.lock:
+                        _apply(self.utxos, block)
+
+                        self.height += 1
+                        self.block_hash = block.current_hash
+                else:
+                    self._replay()
+
+                if block is not None and self.height % self.interval == 0:
+                    self._keep(self.capture())
+            except Exception as e:
+                logger.exception("Failed to update the confirmed outputs [{}]", e)
+
+    def _replay(self) -> None:
+        blocks = self.blocks()
+
+        height = len(blocks)
+        snapshot = self.latest(blocks)
+
+        utxos = UTXOSet(snapshot.utxos if snapshot is not None else ())
+        for block in blocks[snapshot.height if snapshot is not None else 0 : height]:
+            _apply(utxos, block)
+
+        with self.lock:
+            self.utxos = utxos
+            self.height = height
+            self.block_hash = blocks[height - 1].current_hash if height else None
+
+    def _keep(self, snapshot: Snapshot) -> None:
+        with self.lock:
+            self.snapshots = [s for s in self.snapshots if s.height != snapshot.height]
+            self.snapshots.append(snapshot)
+            self.snapshots.sort(key=lambda s: s.height)
+
+            stale, self.snapshots = (
+                self.snapshots[: -self.keep],
+                self.snapshots[-self.keep :],
+            )
+
+        if self.directory is None:
+            return
+
+        # Write to a temporary file first so that a crash never leaves partial snapshots
+        path = self._path(snapshot.height)
+        temporary = path.with_suffix(".tmp")
+        with temporary.open("wb") as file:
+            file.write(snapshot.to_bytes())
+            file.flush()
+            os.fsync(file.fileno())
+
+        os.replace(temporary, path)
+
+        for s in stale:
+            try:
+                self._path(s.height).unlink()
+            except FileNotFoundError:
+                pass
+
+        logger.info(
+            "Saved snapshot of {} outputs at block {}",
+            len(snapshot.utxos),
+            snapshot.height,
+        )
+
+
+def _apply(utxos: UTXOSet, block: Block) -> None:
+    for transaction in block.transactions:
+        try:
+            utxos.apply(transaction)
+        except KeyError as e:
+            logger.error("Skipping transaction {} [{}]", transaction.id, e)
@@ -0,0 +1,242 @@
+import atexit
+import mmap
+import os
+import struct
+import threading
+import typing as tp
+from collections import OrderedDict
+from collections.abc import Sequence
+from pathlib import Path
+
+from components.block import Block
+
+# (offset, size) of a block in the segment file
+RECORD = struct.Struct(">QI")
+
+# The number of appended blocks after which both files are fsync-ed
+SYNC_EVERY = 16
+
+# The number of decoded blocks kept in memory
+CACHE_SIZE = 128
+
+
+class BlockStore(Sequence):
+    """
+    An append-only, on-disk sequence of blocks. Blocks are binary-encoded and appended
+    to a segment file, while a separate index file holds a fixed-size record with the
+    offset and size of every block. Opening a store only reads the index, and blocks
+    are decoded lazily from a memory-mapped view of the segment file.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        sync_every: int = SYNC_EVERY,
+        cache_size: int = CACHE_SIZE,
+    ) -> None:
+        directory.mkdir(parents=True, exist_ok=True)
+
+        self.sync_every = sync_every
+        self.cache_size = cache_size
+
+        self.lock = threading.RLock()
+        self.cache: tp.Dict[int, Block] = OrderedDict()
+        self.map: tp.Optional[mmap.mmap] = None
+        self.unsynced = 0
+
+        self.segment = (directory / "blocks.dat").open("a+b")
+        self.index = (directory / "blocks.idx").open("a+b")
+
+        self.records = self._recover()
+
+        atexit.register(self.close)
+
+    def _recover(self) -> tp.List[tp.Tuple[int, int]]:
+        self.index.seek(0)
+        raw = self.index.read()
+
+        records = [
+            RECORD.unpack_from(raw, offset)
+            for offset in range(0, len(raw) - len(raw) % RECORD.size, RECORD.size)
+        ]
+
+        # Drop the records of blocks that did not make it to the segment file
+        segment_size = os.fstat(self.segment.fileno()).st_size
+        while records and sum(records[-1]) > segment_size:
+            records.pop()
+
+        # Drop any partially written record or block
+        self.index.truncate(len(records) * RECORD.size)
+        self.segment.truncate(sum(records[-1]) if records else 0)
+
+        return records
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __getitem__(self, key: tp.Union[int, slice]) -> tp.Union[Block, tp.List[Block]]:
+        if isinstance(key, slice):
+            return [self[height] for height in range(*key.indices(len(self)))]
+
+        with self.lock:
+            height = key + len(self.records) if key < 0 else key
+            if not 0 <= height < len(self.records):
+                raise IndexError(f"Block {key} is out of range")
+
+            block = self.cache.get(height)
+            if block is not None:
+                self.cache.move_to_end(height)
+                return block
+
+            block = Block.from_bytes(self._read(*self.records[height]))
+
+            self.cache[height] = block
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+
+            return block
+
+    def encoded(self, height: int) -> bytes:
+        """Return the binary encoding of a block without decoding it."""
+        with self.lock:
+            return self._read(*self.records[height])
+
+    def _read(self, offset: int, size: int) -> bytes:
+        # Remap the segment file whenever it has grown past the mapped region
+        if self.map is None or offset + size > len(self.map):
+            if self.map is not None:
+                self.map.close()
+
+            self.map = mmap.mmap(self.segment.fileno(), 0, access=mmap.ACCESS_READ)
+
+        return self.map[offset : offset + size]
+
+    def append(self, block: Block) -> None:
+        data = block.to_bytes()
+
+        with self.lock:
+            offset = sum(self.records[-1]) if self.records else 0
+
+            self.segment.write(data)
+            self.segment.flush()
+
+            self.index.write(RECORD.pack(offset, len(data)))
+            self.index.flush()
+
+            self.records.append((offset, len(data)))
+
+            self.unsynced += 1
+            if self.unsynced >= self.sync_every:
+                self.sync()
+
+    def truncate(self, height: int) -> None:
+        """Discard every block from `height` onwards."""
+        with self.lock:
+            if height >= len(self.records):
+                return
+
+            if self.map is not None:
+                self.map.close()
+                self.map = None
+
+            del self.records[height:]
+            for cached in [h for h in self.cache if h >= height]:
+                del self.cache[cached]
+
+            self.index.truncate(len(self.records) * RECORD.size)
+            self.segment.truncate(sum(self.records[-1]) if self.records else 0)
+
+            self.sync()
+
+    def sync(self) -> None:
+        with self.lock:
+            # The segment goes first so that the index never points past its end
+            os.fsync(self.segment.fileno())
+            os.fsync(self.index.fileno())
+
+            self.unsynced = 0
+
+    def close(self) -> None:
+        with self.lock:
+            if self.segment.closed:
+                return
+
+            self.sync()
+
+            if self.map is not None:
+                self.map.close()
+                self.map = None
+
+            self.segment.close()
+            self.index.close()
+
+
+class PackedBlocks(Sequence):
+    """
+    An in-memory sequence of blocks, each held as its binary encoding rather than as
+    models. Keys, hashes and signatures thus take half the space of their hex strings
+    and no object is allocated per field. Blocks are decoded on access straight off
+    the stored bytes, and the most recently used ones are kept decoded.
+    """
+
+    def __init__(
+        self, blocks: tp.Iterable[Block] = (), cache_size: int = CACHE_SIZE
+    ) -> None:
+        self.cache_size = cache_size
+
+        self.lock = threading.RLock()
+        self.cache: tp.Dict[int, Block] = OrderedDict()
+        self.encodings: tp.List[bytes] = []
+
+        for block in blocks:
+            self.append(block)
+
+    def __len__(self) -> int:
+        return len(self.encodings)
+
+    def __getitem__(self, key: tp.Union[int, slice]) -> tp.Union[Block, tp.List[Block]]:
+        if isinstance(key, slice):
+            return [self[height] for height in range(*key.indices(len(self)))]
+
+        with self.lock:
+            height = key + len(self.encodings) if key < 0 else key
+            if not 0 <= height < len(self.encodings):
+                raise IndexError(f"Block {key} is out of range")
+
+            block = self.cache.get(height)
+            if block is None:
+                block = Block.from_bytes(self.encodings[height])
+
+            self._cache(height, block)
+
+            return block
+
+    def _cache(self, height: int, block: Block) -> None:
+        self.cache[height] = block
+        self.cache.move_to_end(height)
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+    def encoded(self, height: int) -> bytes:
+        """Return the binary encoding of a block without decoding it."""
+        return self.encodings[height]
+
+    def append(self, block: Block) -> None:
+        data = block.to_bytes()
+
+        with self.lock:
+            self.encodings.append(data)
+
+            # The tip of the chain is read far more often than any other block
+            self._cache(len(self.encodings) - 1, block)
+
+    def truncate(self, height: int) -> None:
+        """Discard every block from `height` onwards."""
+        with self.lock:
+            del self.encodings[height:]
+            for cached in [h for h in self.cache if h >= height]:
+                del self.cache[cached]
+
+    def sync(self) -> None:
+        # Nothing is persisted
+        pass
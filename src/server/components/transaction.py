@@ -1,12 +1,40 @@
+import functools
 import hashlib
 import json
 import typing as tp
 
-from components import Serializable
-from Crypto.Hash import SHA256
-from Crypto.PublicKey import RSA
-from Crypto.Signature import PKCS1_v1_5
-from pydantic import Field
+from components import Serializable, crypto
+from components.address import REGISTRY
+from core.codec import Reader, Writer
+from pydantic import Field, validator
+
+# The number of verified signatures kept in memory
+SIGNATURE_CACHE_SIZE = 65536
+
+
+def encode_output(writer: Writer, output: tp.Tuple[str, str, str, int]) -> None:
+    output_id, transaction_id, address, amount = output
+
+    writer.string(output_id)
+    writer.string(transaction_id)
+    writer.string(address)
+    writer.integer(amount)
+
+
+def decode_output(reader: Reader) -> tp.Tuple[str, str, str, int]:
+    return (
+        reader.string(),
+        reader.string(),
+        REGISTRY.canonical(reader.string()),
+        reader.integer(),
+    )
+
+
+@functools.lru_cache(maxsize=SIGNATURE_CACHE_SIZE)
+def _verify(scheme: str, address: str, transaction_id: str, signature: str) -> bool:
+    return crypto.SCHEMES[scheme].verify(
+        address, transaction_id.encode("utf-8"), signature
+    )
 
 
 class Transaction(Serializable):
@@ -20,6 +48,21 @@ class Transaction(Serializable):
     )
     signature: tp.Optional[str] = None
 
+    # Known addresses are swapped for the copy held by the registry, so that the
+    # transactions of a wallet share a single copy of its address
+    @validator("sender_address", "recipient_address")
+    def share_address(cls, address: str) -> str:
+        return REGISTRY.canonical(address)
+
+    @validator("transaction_outputs")
+    def share_output_addresses(
+        cls, outputs: tp.List[tp.Tuple[str, str, str, int]]
+    ) -> tp.List[tp.Tuple[str, str, str, int]]:
+        return [
+            (output_id, transaction_id, REGISTRY.canonical(address), amount)
+            for output_id, transaction_id, address, amount in outputs
+        ]
+
     @property
     def transaction_id(self) -> str:
         return self.id
@@ -61,27 +104,59 @@ class Transaction(Serializable):
         return transaction
 
     def sign_transaction(self, private_key: str) -> None:
-        # Load the private key
-        key = RSA.import_key(bytes.fromhex(private_key))
+        # Sign the transaction ID with the (cached) private key of the cluster scheme
+        self.signature = crypto.scheme().sign(private_key, self.id.encode("utf-8"))
 
-        # Hash the transaction ID
-        h = SHA256.new(self.id.encode("utf-8"))
+    def verify_signature(self):
+        # Transactions are seen more than once, so the outcome is memoized
+        return _verify(
+            crypto.scheme().name, self.sender_address, self.id, self.signature
+        )
 
-        # Sign the hash with the private key
-        signer = PKCS1_v1_5.new(key)
-        signature = signer.sign(h)
+    def encode(self, writer: Writer) -> None:
+        writer.string(self.sender_address)
+        writer.string(self.recipient_address)
+        writer.integer(self.amount)
+        writer.string(self.id)
+        writer.sequence(self.transaction_inputs, writer.string)
+        writer.sequence(
+            self.transaction_outputs, lambda output: encode_output(writer, output)
+        )
+        writer.string(self.signature)
 
-        # Return the signature as a hex string
-        self.signature = signature.hex()
+    @classmethod
+    def decode(cls, reader: Reader) -> "Transaction":
+        # The encoding is trusted to be well-typed, so validation is skipped
+        return cls.construct(
+            sender_address=REGISTRY.canonical(reader.string()),
+            recipient_address=REGISTRY.canonical(reader.string()),
+            amount=reader.integer(),
+            id=reader.string(),
+            transaction_inputs=reader.sequence(reader.string),
+            transaction_outputs=reader.sequence(lambda: decode_output(reader)),
+            signature=reader.string(),
+        )
+
+    @classmethod
+    def cache_info(cls) -> tp.Dict[str, tp.Dict[str, int]]:
+        return {
+            name: cache.cache_info()._asdict()
+            for name, cache in (
+                ("signers", crypto._signer),
+                ("verifiers", crypto._verifier),
+                ("signatures", _verify),
+            )
+        }
 
-    def verify_signature(self):
-        # Load the public key of the sender
-        key = RSA.import_key(bytes.fromhex(self.sender_address))
 
-        # Hash the transaction ID
-        h = SHA256.new(self.id.encode("utf-8"))
+class TransactionBatch(Serializable):
+    transactions: tp.List[Transaction] = Field(default_factory=list)
 
-        # Verify the signature
-        verifier = PKCS1_v1_5.new(key)
+    def encode(self, writer: Writer) -> None:
+        writer.sequence(self.transactions, lambda t: t.encode(writer))
 
-        return verifier.verify(h, bytes.fromhex(self.signature))
+    @classmethod
+    def decode(cls, reader: Reader) -> "TransactionBatch":
+        return cls.construct(
+            transactions=reader.sequence(lambda: Transaction.decode(reader))
+        )
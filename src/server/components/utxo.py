@@ -0,0 +1,181 @@
+import typing as tp
+from collections import OrderedDict
+
+from components.address import REGISTRY, AddressRegistry
+from components.transaction import Transaction
+from core.codec import compact, expand
+from core.locks import LockStripes
+
+# (output id, transaction id, address, amount)
+UTXO = tp.Tuple[str, str, str, int]
+
+
+class Output:
+    """
+    An unspent output as held by a set, with its hex transaction id as the bytes it
+    encodes and its address as its id in a registry. Outputs are handed out as `UTXO`
+    tuples.
+    """
+
+    __slots__ = ("transaction_id", "address", "amount")
+
+    def __init__(
+        self,
+        transaction_id: tp.Union[bytes, str],
+        address: int,
+        amount: int,
+    ) -> None:
+        self.transaction_id = transaction_id
+        self.address = address
+        self.amount = amount
+
+    @classmethod
+    def from_utxo(cls, utxo: UTXO, registry: AddressRegistry) -> "Output":
+        _, transaction_id, address, amount = utxo
+
+        return cls(compact(transaction_id), registry.intern(address), amount)
+
+    def to_utxo(self, output_id: str, registry: AddressRegistry) -> UTXO:
+        return (
+            output_id,
+            expand(self.transaction_id),
+            registry.address(self.address),
+            self.amount,
+        )
+
+
+class UTXOSet:
+    """
+    The unspent transaction outputs known to a node, keyed by output id, along with a
+    per-address index and running balances so that crediting, spending, looking up an
+    output and querying a balance are all O(1). Outputs are kept as compact records
+    rather than tuples of hex strings, and both indexes are keyed by the ids of
+    addresses in a registry.
+
+    Transactions are applied and reverted while holding the locks of the addresses
+    they involve, so that transactions between unrelated addresses proceed in
+    parallel. Looking up outputs and balances takes no locks at all.
+    """
+
+    def __init__(
+        self, utxos: tp.Iterable[UTXO] = (), registry: AddressRegistry = REGISTRY
+    ) -> None:
+        self.registry = registry
+
+        self.outputs: tp.Dict[str, Output] = {}
+        self.addresses: tp.Dict[int, tp.Dict[str, None]] = {}
+        self.balances: tp.Dict[int, int] = {}
+        self.locks = LockStripes()
+
+        for utxo in utxos:
+            self.credit(utxo)
+
+    def __len__(self) -> int:
+        return len(self.outputs)
+
+    def __contains__(self, output_id: str) -> bool:
+        return output_id in self.outputs
+
+    def __iter__(self) -> tp.Iterator[UTXO]:
+        for output_id, output in list(self.outputs.items()):
+            yield output.to_utxo(output_id, self.registry)
+
+    def get(self, output_id: str) -> tp.Optional[UTXO]:
+        output = self.outputs.get(output_id)
+
+        if output is None:
+            return None
+
+        return output.to_utxo(output_id, self.registry)
+
+    def balance(self, address: str) -> int:
+        return self.balances.get(self.registry.find(address), 0)
+
+    def utxos(self, address: str) -> tp.List[UTXO]:
+        """Return the unspent outputs of an address, oldest first."""
+        id = self.registry.find(address)
+
+        with self.locks(address):
+            return [
+                self.outputs[output_id].to_utxo(output_id, self.registry)
+                for output_id in self.addresses.get(id, ())
+            ]
+
+    def locked(self, transaction: Transaction) -> tp.ContextManager[None]:
+        """Lock the addresses whose outputs a transaction spends or credits."""
+        return self.locks(
+            transaction.sender_address,
+            *(address for _, _, address, _ in transaction.transaction_outputs),
+        )
+
+    def credit(self, utxo: UTXO) -> None:
+        output_id = utxo[0]
+        if output_id in self.outputs:
+            raise KeyError(f"Output {output_id} is already unspent")
+
+        output = self.outputs[output_id] = Output.from_utxo(utxo, self.registry)
+
+        self.addresses.setdefault(output.address, OrderedDict())[output_id] = None
+        self.balances[output.address] = (
+            self.balances.get(output.address, 0) + output.amount
+        )
+
+    def spend(self, output_id: str) -> UTXO:
+        output = self.outputs.pop(output_id)
+
+        del self.addresses[output.address][output_id]
+        self.balances[output.address] -= output.amount
+
+        return output.to_utxo(output_id, self.registry)
+
+    def apply(self, transaction: Transaction) -> tp.List[UTXO]:
+        """
+        Spend the inputs of a transaction and credit its outputs, returning the spent
+        outputs so that the transaction can be reverted. Nothing is changed unless the
+        whole transaction can be applied.
+        """
+        with self.locked(transaction):
+            inputs = transaction.transaction_inputs
+
+            # Zero-valued change is not worth keeping track of
+            credited = [utxo for utxo in transaction.transaction_outputs if utxo[3] > 0]
+
+            missing = [
+                output_id for output_id in inputs if output_id not in self.outputs
+            ]
+            if missing:
+                raise KeyError(
+                    f"Transaction {transaction.id} spends unknown outputs {missing}"
+                )
+
+            if len(set(inputs)) != len(inputs):
+                raise KeyError(f"Transaction {transaction.id} spends an output twice")
+
+            output_ids = [utxo[0] for utxo in credited]
+            existing = [
+                output_id for output_id in output_ids if output_id in self.outputs
+            ]
+            if existing:
+                raise KeyError(
+                    f"Transaction {transaction.id} credits existing outputs {existing}"
+                )
+
+            if len(set(output_ids)) != len(output_ids):
+                raise KeyError(f"Transaction {transaction.id} credits an output twice")
+
+            spent = [self.spend(output_id) for output_id in inputs]
+
+            for utxo in credited:
+                self.credit(utxo)
+
+            return spent
+
+    def revert(self, transaction: Transaction, spent: tp.List[UTXO]) -> None:
+        """Undo applying a transaction, given the outputs it has spent."""
+        with self.locked(transaction):
+            for output_id, *_ in transaction.transaction_outputs:
+                if output_id in self.outputs:
+                    self.spend(output_id)
+
+            for utxo in spent:
+                self.credit(utxo)
@@ -0,0 +1,132 @@
+import multiprocessing
+import queue
+import typing as tp
+
+from components import crypto
+from components.block import Block
+from core.result import Result
+
+# The number of consecutive blocks validated by a single task
+CHUNK_SIZE = 64
+
+# The maximum number of chains validated at the same time
+SLOTS = 32
+
+_abort_flags = None
+
+
+def _initialize(abort_flags, scheme: str) -> None:
+    global _abort_flags
+
+    _abort_flags = abort_flags
+
+    # Workers started afresh rather than forked know nothing of the cluster scheme
+    crypto.use_scheme(scheme)
+
+
+def _validate_blocks(
+    blocks: tp.List[Block], previous_hash: str, slot: int
+) -> tp.Optional[Result]:
+    for block in blocks:
+        # Another range of the same chain has already failed
+        if _abort_flags[slot]:
+            return None
+
+        result = validate_block(block, previous_hash)
+        if not result:
+            return result
+
+        previous_hash = block.current_hash
+
+    return Result.ok()
+
+
+def validate_block(block: Block, previous_hash: str) -> Result:
+    # Check if block includes any transaction more than once
+    ids = {transaction.id for transaction in block.transactions}
+    if len(ids) != len(block.transactions):
+        return Result.invalid(f"Block {block.index} has duplicate transactions")
+
+    # Check if block's merkle root commits to its transactions
+    if block.merkle_root != Block.merkle_tree(block.transactions).root():
+        return Result.invalid(f"Block {block.index} has incorrect merkle root")
+
+    # Check if block's previous hash is equal to hash of previous block, before
+    # hashing a header that may be missing it
+    if block.previous_hash != previous_hash:
+        return Result.invalid(f"Block {block.index} previous hash mismatch")
+
+    # Check if block's current hash is correct
+    block_hash = Block.calculate_hash(block)
+    if block_hash != block.current_hash:
+        return Result.invalid(f"Block {block.index} has incorrect hash")
+
+    # Check if every transaction of the block is signed by its sender
+    for transaction in block.transactions:
+        if not transaction.verify_signature():
+            return Result.invalid(
+                f"Block {block.index} has invalid transaction {transaction.id}"
+            )
+
+    return Result.ok()
+
+
+class ChainValidator:
+    """
+    Validates whole chains by splitting them into ranges of consecutive blocks that
+    are checked independently by a pool of worker processes. As soon as one range
+    fails, the remaining ranges of the same chain are abandoned.
+    """
+
+    def __init__(self, n_workers: int = 1, chunk_size: int = CHUNK_SIZE) -> None:
+        self.n_workers = max(n_workers, 1)
+        self.chunk_size = chunk_size
+
+        self.pool = None
+        if self.n_workers > 1:
+            self.abort_flags = multiprocessing.RawArray("b", SLOTS)
+            self.pool = multiprocessing.Pool(
+                self.n_workers,
+                initializer=_initialize,
+                initargs=(self.abort_flags, crypto.scheme().name),
+            )
+
+            self.slots = queue.Queue()
+            for slot in range(SLOTS):
+                self.slots.put(slot)
+
+    def validate(self, blocks: tp.Sequence[Block]) -> Result:
+        """Validate every block of a chain but the genesis block."""
+        if self.pool is None:
+            for i in range(1, len(blocks)):
+                result = validate_block(blocks[i], blocks[i - 1].current_hash)
+                if not result:
+                    return result
+
+            return Result.ok()
+
+        slot = self.slots.get()
+        try:
+            self.abort_flags[slot] = 0
+
+            def abort_on_failure(result: tp.Optional[Result]) -> None:
+                if result is not None and not result:
+                    self.abort_flags[slot] = 1
+
+            tasks = [
+                self.pool.apply_async(
+                    _validate_blocks,
+                    (blocks[i : i + self.chunk_size], blocks[i - 1].current_hash, slot),
+                    callback=abort_on_failure,
+                )
+                for i in range(1, len(blocks), self.chunk_size)
+            ]
+
+            # Report the earliest failure of the chain
+            for result in [task.get() for task in tasks]:
+                if result is not None and not result:
+                    return result
+
+            return Result.ok()
+        finally:
+            self.slots.put(slot)
@@ -1,7 +1,6 @@
 import typing as tp
 
-from components import Serializable
-from Crypto.PublicKey import RSA
+from components import Serializable, crypto
 from pydantic import Field
 
 
@@ -12,15 +11,11 @@ class Wallet(Serializable):
 
     @classmethod
     def generate_wallet(cls) -> "Wallet":
-        # Generate a new RSA key pair
-        key_pair = RSA.generate(2048)
+        # Generate a new key pair of the signature scheme of the cluster
+        public_key, private_key = crypto.scheme().generate()
 
-        # Extract the public and private keys
-        private_key = key_pair.export_key()
-        public_key = key_pair.publickey().export_key()
-
-        # Return the keys as hex-encoded strings
-        return Wallet(public_key=public_key.hex(), private_key=private_key.hex())
+        # The keys are already hex-encoded strings
+        return Wallet(public_key=public_key, private_key=private_key)
 
     @property
     def balance(self) -> int:
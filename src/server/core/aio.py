@@ -0,0 +1,333 @@
+import asyncio
+import io
+import sys
+import threading
+import typing as tp
+from concurrent.futures import Future, ThreadPoolExecutor
+from urllib.parse import unquote
+
+import aiohttp
+import requests
+from aiohttp import web
+from core.http import TIMEOUT, Transport, adapt
+from flask import Flask
+
+# The number of threads running the application, which may block on the node
+WORKERS = 32
+
+# The maximum number of connections open to every peer at once
+MAX_CONNECTIONS = 256
+
+# The maximum size of a request body, and of a response body that is not streamed;
+# larger requests are answered with 413
+MAX_BODY_SIZE = 64 * 1024 * 1024
+
+# The size of the chunks response bodies are read in
+CHUNK_SIZE = 64 * 1024
+
+Headers = tp.List[tp.Tuple[str, str]]
+
+
+class Server:
+    """
+    Serves a WSGI application from an aiohttp event loop. Connections are read from
+    and written to on the loop, so that idle and slow clients cost no threads, while
+    the application, which validates blocks and transactions synchronously, runs on a
+    pool of worker threads. A response is produced by a single worker, as streamed
+    responses of Flask must be iterated within the same thread.
+
+    Parsing and framing are left to aiohttp, which rejects oversized heads and answers
+    bodies larger than `MAX_BODY_SIZE` with 413 before they are buffered in full.
+    """
+
+    def __init__(self, app: Flask, host: str, port: int) -> None:
+        self.app = app
+        self.host = host
+        self.port = port
+
+    async def handle(self, request: web.Request) -> web.StreamResponse:
+        body = await request.read()
+
+        response = web.StreamResponse()
+        await asyncio.get_event_loop().run_in_executor(
+            None,
+            self.respond,
+            asyncio.get_event_loop(),
+            request,
+            response,
+            self.environ(request, body),
+        )
+
+        return response
+
+    def environ(self, request: web.Request, body: bytes) -> tp.Dict[str, tp.Any]:
+        peer = None
+        if request.transport is not None:
+            peer = request.transport.get_extra_info("peername")
+        peer = peer or ("", 0)
+
+        environ = {
+            "REQUEST_METHOD": request.method,
+            "SCRIPT_NAME": "",
+            "PATH_INFO": unquote(
+                request.raw_path.partition("?")[0], encoding="latin-1"
+            ),
+            "QUERY_STRING": request.query_string,
+            "CONTENT_LENGTH": str(len(body)),
+            "SERVER_NAME": self.host,
+            "SERVER_PORT": str(self.port),
+            "SERVER_PROTOCOL": "HTTP/{}.{}".format(*request.version),
+            "REMOTE_ADDR": peer[0],
+            "REMOTE_PORT": str(peer[1]),
+            "wsgi.version": (1, 0),
+            "wsgi.url_scheme": "http",
+            "wsgi.input": io.BytesIO(body),
+            "wsgi.errors": sys.stderr,
+            "wsgi.multithread": True,
+            "wsgi.multiprocess": False,
+            "wsgi.run_once": False,
+        }
+
+        # The body has already been read in full, however it was framed
+        for name, value in request.headers.items():
+            key = name.upper().replace("-", "_")
+            if key in ("CONTENT_LENGTH", "TRANSFER_ENCODING"):
+                continue
+
+            if key != "CONTENT_TYPE":
+                key = f"HTTP_{key}"
+
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+
+        return environ
+
+    def respond(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        request: web.Request,
+        response: web.StreamResponse,
+        environ: tp.Dict[str, tp.Any],
+    ) -> None:
+        """Run the application and write its response from a worker thread."""
+
+        def run(coroutine: tp.Awaitable[tp.Any]) -> None:
+            asyncio.run_coroutine_threadsafe(coroutine, loop).result()
+
+        started: tp.List[tp.Any] = []
+
+        def start_response(status: str, headers: Headers, exc_info=None):
+            started[:] = [status, headers]
+
+            # Flask never writes outside of the iterable it returns
+            return None
+
+        iterable = self.app(environ, start_response)
+        try:
+            chunks = (chunk for chunk in iterable if chunk)
+
+            # Headers may only be set once the first chunk has been produced
+            first = next(chunks, b"")
+
+            status, headers = started
+            code, _, reason = status.partition(" ")
+            response.set_status(int(code), reason or None)
+
+            # Responses without a length are sent chunked by aiohttp
+            for name, value in headers:
+                if name.lower() == "content-length":
+                    response.content_length = int(value)
+                else:
+                    response.headers.add(name, value)
+
+            run(response.prepare(request))
+            if request.method == "HEAD":
+                return
+
+            if first:
+                run(response.write(first))
+            for chunk in chunks:
+                run(response.write(chunk))
+        except ConnectionError:
+            # The client went away; aiohttp closes the connection once this returns
+            pass
+        finally:
+            if hasattr(iterable, "close"):
+                iterable.close()
+
+
+def serve(app: Flask, host: str, port: int, workers: int = WORKERS) -> None:
+    """Serve an application forever from an event loop of the calling thread."""
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=workers))
+
+    application = web.Application(client_max_size=MAX_BODY_SIZE)
+    application.router.add_route("*", "/{path:.*}", Server(app, host, port).handle)
+
+    runner = web.AppRunner(application, access_log=None)
+    loop.run_until_complete(runner.setup())
+    loop.run_until_complete(
+        web.TCPSite(runner, host.strip("[]"), port, backlog=1024).start()
+    )
+    loop.run_forever()
+
+
+async def _translate(awaitable: tp.Awaitable[tp.Any]) -> tp.Any:
+    """Await a coroutine, raising the exceptions `requests` would have raised."""
+    try:
+        return await awaitable
+    except asyncio.TimeoutError as e:
+        raise requests.Timeout(str(e) or "Timed out") from e
+    except (aiohttp.ClientError, OSError, ValueError) as e:
+        raise requests.ConnectionError(str(e)) from e
+
+
+class Body(io.RawIOBase):
+    """The body of a streamed response, read off the event loop as it arrives."""
+
+    def __init__(
+        self, loop: asyncio.AbstractEventLoop, response: aiohttp.ClientResponse
+    ) -> None:
+        super().__init__()
+
+        self.loop = loop
+        self.response = response
+
+        self.buffer = b""
+        self.done = False
+
+    def readable(self) -> bool:
+        return True
+
+    def _fetch(self) -> None:
+        future = asyncio.run_coroutine_threadsafe(
+            _translate(self.response.content.readany()), self.loop
+        )
+        try:
+            chunk = future.result()
+        except requests.RequestException:
+            self._finish()
+            raise
+
+        if not chunk:
+            self._finish()
+        else:
+            self.buffer += chunk
+
+    def _finish(self) -> None:
+        if not self.done:
+            self.done = True
+
+            # A connection whose body was not read to the end is closed, not reused
+            self.loop.call_soon_threadsafe(self.response.release)
+
+    def read(self, size: int = -1) -> bytes:
+        while not self.done and (size < 0 or not self.buffer):
+            self._fetch()
+
+        if size < 0:
+            size = len(self.buffer)
+
+        chunk, self.buffer = self.buffer[:size], self.buffer[size:]
+
+        return chunk
+
+    def close(self) -> None:
+        self._finish()
+
+        super().close()
+
+
+class AsyncTransport(Transport):
+    """
+    Carries requests over an aiohttp session, whose event loop runs on a thread of
+    its own, so that requests waiting on slow peers hold no threads and thousands of
+    them may be in flight at once. Connections to every peer are kept alive and
+    reused.
+    """
+
+    def __init__(self, max_connections: int = MAX_CONNECTIONS) -> None:
+        # Requests are carried by the event loop rather than by an executor
+        self.loop = asyncio.new_event_loop()
+        threading.Thread(target=self.loop.run_forever, daemon=True).start()
+
+        self.session = asyncio.run_coroutine_threadsafe(
+            self._open(max_connections), self.loop
+        ).result()
+
+    async def _open(self, max_connections: int) -> aiohttp.ClientSession:
+        # A session must be created on the loop it is used from
+        return aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=0, limit_per_host=max_connections)
+        )
+
+    async def _request(
+        self,
+        method: str,
+        url: str,
+        headers: tp.Dict[str, str],
+        data: tp.Optional[tp.Union[str, bytes]],
+        timeout,
+        stream: bool,
+    ) -> requests.Response:
+        connect_timeout, read_timeout = (
+            timeout if isinstance(timeout, tuple) else (timeout, timeout)
+        )
+
+        response = await self.session.request(
+            method,
+            url,
+            headers=headers,
+            data=data,
+            timeout=aiohttp.ClientTimeout(
+                sock_connect=connect_timeout, sock_read=read_timeout
+            ),
+        )
+
+        if stream:
+            adapted = adapt(url, response.status, response.headers.items(), b"")
+            adapted.raw = Body(self.loop, response)
+            adapted._content = False
+            adapted._content_consumed = False
+
+            return adapted
+
+        async with response:
+            content = bytearray()
+            async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                content += chunk
+                if len(content) > MAX_BODY_SIZE:
+                    raise ValueError(f"{url} responded with over {MAX_BODY_SIZE} bytes")
+
+        return adapt(url, response.status, response.headers.items(), bytes(content))
+
+    def submit(
+        self,
+        method: str,
+        url: str,
+        headers: tp.Dict[str, str],
+        data: tp.Optional[tp.Union[str, bytes]] = None,
+        timeout=TIMEOUT,
+        stream: bool = False,
+    ) -> Future:
+        return asyncio.run_coroutine_threadsafe(
+            _translate(self._request(method, url, headers, data, timeout, stream)),
+            self.loop,
+        )
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        headers: tp.Dict[str, str],
+        data: tp.Optional[tp.Union[str, bytes]] = None,
+        timeout=TIMEOUT,
+        stream: bool = False,
+    ) -> requests.Response:
+        return self.submit(method, url, headers, data, timeout, stream).result()
+
+    def close(self) -> None:
+        """Close every connection and stop the event loop."""
+        asyncio.run_coroutine_threadsafe(self.session.close(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
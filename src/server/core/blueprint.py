@@ -2,8 +2,9 @@ import json
 import typing as tp
 from http import HTTPStatus
 
+from core.codec import MEDIA_TYPE, NDJSON_MEDIA_TYPE, Writer
 from core.error import Error
-from flask import Flask, abort
+from flask import Flask, Response, abort, request, stream_with_context
 from flask.blueprints import Blueprint as BaseBlueprint
 from werkzeug.utils import find_modules, import_string
 
@@ -27,7 +28,53 @@ class Blueprint(BaseBlueprint):
             abort(status, {"message": message})
 
     def bad_request(self, message: str):
-        self.error(HTTPStatus.BAD_REQUEST, message)
+        self.error((HTTPStatus.BAD_REQUEST, message))
+
+    def parse(self, model: tp.Type[tp.Any]) -> tp.Any:
+        """Parse the request body into a model according to its content type."""
+        try:
+            if request.mimetype == MEDIA_TYPE:
+                return model.from_bytes(request.get_data())
+
+            return model.from_json(request.json)
+        except (TypeError, ValueError) as e:
+            self.bad_request(f"Malformed {model.__name__} [{e}]")
+
+    def serialize(self, instance: tp.Any):
+        """Respond with a model in the representation preferred by the client."""
+        mimetype = request.accept_mimetypes.best_match(["application/json", MEDIA_TYPE])
+        if mimetype == MEDIA_TYPE:
+            return instance.to_bytes(), 200, {"Content-Type": MEDIA_TYPE}
+
+        return self.success(instance.json())
+
+    def stream(self, key: str, instances: tp.Iterable[tp.Any]) -> Response:
+        """
+        Respond with a sequence of models, serializing them one at a time as the
+        response is being sent. Models are either framed in their binary encoding,
+        written one per line or wrapped in a JSON object under `key`.
+        """
+        mimetype = request.accept_mimetypes.best_match(
+            ["application/json", NDJSON_MEDIA_TYPE, MEDIA_TYPE]
+        )
+
+        def generate() -> tp.Iterator[tp.Union[str, bytes]]:
+            if mimetype == MEDIA_TYPE:
+                for instance in instances:
+                    writer = Writer()
+                    writer.blob(instance.to_bytes())
+
+                    yield writer.getvalue()
+            elif mimetype == NDJSON_MEDIA_TYPE:
+                for instance in instances:
+                    yield instance.json() + "\n"
+            else:
+                yield "{" + json.dumps(key) + ": ["
+                for i, instance in enumerate(instances):
+                    yield instance.json() if i == 0 else "," + instance.json()
+                yield "]}"
+
+        return Response(stream_with_context(generate()), mimetype=mimetype)
 
     def success(self, payload: tp.Optional[tp.Any] = None):
         if payload is None:
@@ -0,0 +1,11 @@
+import typing as tp
+
+import click
+
+
+def integers(_, __, value: str) -> tp.List[int]:
+    """Parse an option holding a comma-separated list of integers."""
+    try:
+        return [int(item) for item in value.split(",") if item]
+    except ValueError:
+        raise click.BadParameter("Expected a comma-separated list of integers")
@@ -0,0 +1,188 @@
+import typing as tp
+from datetime import datetime, timedelta
+
+MEDIA_TYPE = "application/x-noobcash"
+
+# Streams of JSON documents, one per line
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+EPOCH = datetime(1970, 1, 1)
+
+# The tags distinguishing the representations of a (possibly missing) string
+NONE, HEX, TEXT, HEX_INDEX = range(4)
+
+
+def _is_hex(value: str) -> bool:
+    try:
+        return bytes.fromhex(value).hex() == value
+    except ValueError:
+        return False
+
+
+def compact(value: str) -> tp.Union[bytes, str]:
+    """Hold a lowercase hex string as the bytes it encodes, and any other as it is."""
+    try:
+        packed = bytes.fromhex(value)
+    except ValueError:
+        return value
+
+    return packed if packed.hex() == value else value
+
+
+def expand(value: tp.Union[bytes, str]) -> str:
+    """Undo `compact`."""
+    return value.hex() if isinstance(value, bytes) else value
+
+
+class Writer:
+    """
+    Serializes values into a compact binary representation. Integers are written as
+    zigzag varints, byte strings are length-prefixed and lowercase hex strings, such
+    as keys, signatures and hashes, are written as the raw bytes they encode.
+    """
+
+    def __init__(self) -> None:
+        self.buffer = bytearray()
+
+    def getvalue(self) -> bytes:
+        return bytes(self.buffer)
+
+    def uvarint(self, value: int) -> None:
+        while value > 0x7F:
+            self.buffer.append((value & 0x7F) | 0x80)
+            value >>= 7
+
+        self.buffer.append(value)
+
+    def integer(self, value: int) -> None:
+        self.uvarint(value << 1 if value >= 0 else (-value << 1) - 1)
+
+    def blob(self, value: bytes) -> None:
+        self.uvarint(len(value))
+        self.buffer += value
+
+    def raw(self, value: bytes) -> None:
+        """Append a value that has already been encoded."""
+        self.buffer += value
+
+    def string(self, value: tp.Optional[str]) -> None:
+        if value is None:
+            self.buffer.append(NONE)
+        elif _is_hex(value):
+            self.buffer.append(HEX)
+            self.blob(bytes.fromhex(value))
+        else:
+            # Output ids are of the form <transaction id>:<index>
+            prefix, separator, suffix = value.rpartition(":")
+            if (
+                separator
+                and _is_hex(prefix)
+                and suffix.isdigit()
+                and str(int(suffix)) == suffix
+            ):
+                self.buffer.append(HEX_INDEX)
+                self.blob(bytes.fromhex(prefix))
+                self.uvarint(int(suffix))
+            else:
+                self.buffer.append(TEXT)
+                self.blob(value.encode("utf-8"))
+
+    def timestamp(self, value: datetime) -> None:
+        if value.tzinfo is not None:
+            raise ValueError(f"Encoding aware datetime '{value}' is not supported")
+
+        self.integer((value - EPOCH) // timedelta(microseconds=1))
+
+    def sequence(
+        self, values: tp.Sequence[tp.Any], encode: tp.Callable[[tp.Any], None]
+    ) -> None:
+        self.uvarint(len(values))
+        for value in values:
+            encode(value)
+
+
+class Reader:
+    def __init__(self, data: bytes) -> None:
+        self.data = memoryview(data)
+        self.offset = 0
+
+    def uvarint(self) -> int:
+        value, shift = 0, 0
+        while True:
+            byte = self.data[self.offset]
+            self.offset += 1
+
+            value |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                return value
+
+            shift += 7
+
+    def integer(self) -> int:
+        value = self.uvarint()
+
+        return value >> 1 if value & 1 == 0 else -((value + 1) >> 1)
+
+    def blob(self) -> bytes:
+        size = self.uvarint()
+
+        value = self.data[self.offset : self.offset + size]
+        if len(value) != size:
+            raise ValueError("Unexpected end of data")
+
+        self.offset += size
+
+        return value.tobytes()
+
+    def string(self) -> tp.Optional[str]:
+        tag = self.data[self.offset]
+        self.offset += 1
+
+        if tag == NONE:
+            return None
+        elif tag == HEX:
+            return self.blob().hex()
+        elif tag == HEX_INDEX:
+            return f"{self.blob().hex()}:{self.uvarint()}"
+        elif tag == TEXT:
+            return self.blob().decode("utf-8")
+        else:
+            raise ValueError(f"Unknown string tag {tag}")
+
+    def timestamp(self) -> datetime:
+        return EPOCH + timedelta(microseconds=self.integer())
+
+    def sequence(self, decode: tp.Callable[[], tp.Any]) -> tp.List[tp.Any]:
+        return [decode() for _ in range(self.uvarint())]
+
+    def done(self) -> bool:
+        return self.offset == len(self.data)
+
+
+def read_frames(stream: tp.BinaryIO) -> tp.Iterator[bytes]:
+    """Read length-prefixed frames, as written by `Writer.blob`, off a stream."""
+    while True:
+        size, shift = 0, 0
+        while True:
+            byte = stream.read(1)
+            if not byte:
+                if shift > 0:
+                    raise ValueError("Unexpected end of data")
+
+                return
+
+            size |= (byte[0] & 0x7F) << shift
+            if byte[0] < 0x80:
+                break
+
+            shift += 7
+
+        frame = bytearray()
+        while len(frame) < size:
+            chunk = stream.read(size - len(frame))
+            if not chunk:
+                raise ValueError("Unexpected end of data")
+
+            frame += chunk
+
+        yield bytes(frame)
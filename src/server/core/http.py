@@ -1,33 +1,221 @@
+import io
 import json
+import threading
 import typing as tp
+from concurrent.futures import Future, ThreadPoolExecutor
+from urllib.parse import urlsplit
 
 import requests
+from core.codec import MEDIA_TYPE, NDJSON_MEDIA_TYPE, read_frames
 from loguru import logger
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
 
+# Seconds to wait for a connection to be established and for a response respectively
+TIMEOUT = (3.05, 30)
 
-def get(url: str):
-    logger.info("GET {}", url)
+# The maximum number of requests in flight at any time
+MAX_WORKERS = 32
+
+# Whether to exchange models in their compact binary encoding instead of JSON
+_binary = False
+
+_sessions: tp.Dict[str, requests.Session] = {}
+_sessions_lock = threading.Lock()
+
+
+def use_binary(enabled: bool) -> None:
+    global _binary
+
+    _binary = enabled
+
+
+def decode(response: requests.Response, model: tp.Type[tp.Any]) -> tp.Any:
+    """Parse a response into a model according to its content type."""
+    if response.headers.get("Content-Type", "").startswith(MEDIA_TYPE):
+        return model.from_bytes(response.content)
+
+    return model.from_json(response.json())
+
+
+def adapt(
+    url: str, status_code: int, headers: tp.Iterable[tp.Tuple[str, str]], content: bytes
+) -> requests.Response:
+    """Wrap a fully read response as though it had been received by `requests`."""
+    response = requests.Response()
+    response.url = url
+    response.status_code = status_code
+    response.headers = CaseInsensitiveDict(dict(headers))
+    response.raw = io.BytesIO(content)
+    response._content = content
+    response._content_consumed = True
+
+    return response
+
+
+def _session(url: str) -> requests.Session:
+    """Return the keep-alive session of the peer the url points to."""
+    origin = "{0.scheme}://{0.netloc}".format(urlsplit(url))
 
-    return requests.get(url)
+    with _sessions_lock:
+        session = _sessions.get(origin)
+        if session is None:
+            session = requests.Session()
+            session.mount(origin, HTTPAdapter(pool_maxsize=MAX_WORKERS))
 
+            _sessions[origin] = session
 
-def post(url: str, payload: tp.Any) -> tp.Optional[tp.Dict[str, tp.Any]]:
-    logger.info("POST {}", url)
+    return session
 
+
+class Transport:
+    """
+    Carries the requests of a node to its peers, over HTTP by default. Transports
+    raise `requests.RequestException` on failure and run concurrent requests on their
+    own executor.
+    """
+
+    def __init__(self, max_workers: int = MAX_WORKERS) -> None:
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        headers: tp.Dict[str, str],
+        data: tp.Optional[tp.Union[str, bytes]] = None,
+        timeout=TIMEOUT,
+        stream: bool = False,
+    ) -> requests.Response:
+        return _session(url).request(
+            method, url, headers=headers, data=data, timeout=timeout, stream=stream
+        )
+
+    def submit(
+        self,
+        method: str,
+        url: str,
+        headers: tp.Dict[str, str],
+        data: tp.Optional[tp.Union[str, bytes]] = None,
+        timeout=TIMEOUT,
+    ) -> Future:
+        """Start a request without waiting for its response."""
+        return self.executor.submit(self.request, method, url, headers, data, timeout)
+
+
+_transport = Transport()
+
+
+def use_transport(transport: Transport) -> None:
+    global _transport
+
+    _transport = transport
+
+
+def _encode(payload: tp.Any) -> tp.Tuple[tp.Union[str, bytes], str]:
     if isinstance(payload, dict):
-        payload = json.dumps(payload)
-    else:
-        payload = payload.json()
-
-    response = requests.post(
-        url,
-        data=payload,
-        headers={"Content-type": "application/json", "Accept": "text/plain"},
-    )
+        return json.dumps(payload), "application/json"
+
+    if _binary and payload.supports_bytes():
+        return payload.to_bytes(), MEDIA_TYPE
+
+    return payload.json(), "application/json"
+
+
+def _accept() -> str:
+    if _binary:
+        return f"{MEDIA_TYPE}, application/json;q=0.9"
+
+    return "application/json"
+
+
+def _submit(
+    method: str,
+    url: str,
+    headers: tp.Dict[str, str],
+    data: tp.Optional[tp.Union[str, bytes]] = None,
+    timeout=TIMEOUT,
+) -> Future:
+    logger.info("{} {}", method, url)
+
+    return _transport.submit(method, url, headers, data, timeout)
+
+
+def _wait(method: str, url: str, future: Future) -> tp.Optional[requests.Response]:
+    try:
+        response = future.result()
+    except requests.RequestException as e:
+        logger.error("{} {} failed [{}]", method, url, e)
+        return None
+
     if response.status_code != 200:
-        logger.error("POST {} failed [{}]", url, response.status_code)
+        logger.error("{} {} failed [{}]", method, url, response.status_code)
+
+    return response
+
+
+def get(url: str, timeout=TIMEOUT) -> tp.Optional[requests.Response]:
+    return _wait("GET", url, _submit("GET", url, {"Accept": _accept()}, None, timeout))
+
+
+def stream(url: str, model: tp.Type[tp.Any], timeout=TIMEOUT) -> tp.Iterator[tp.Any]:
+    """
+    GET a sequence of models, parsing each one as soon as it has been received. The
+    sequence ends early if the request fails midway.
+    """
+    logger.info("GET {}", url)
+
+    accept = NDJSON_MEDIA_TYPE
+    if _binary:
+        accept = f"{MEDIA_TYPE}, {NDJSON_MEDIA_TYPE};q=0.9"
 
     try:
-        return response
-    except Exception as e:
-        logger.error("POST {} failed [{}]", e)
+        with _transport.request(
+            "GET", url, headers={"Accept": accept}, timeout=timeout, stream=True
+        ) as response:
+            if response.status_code != 200:
+                logger.error("GET {} failed [{}]", url, response.status_code)
+                return
+
+            if response.headers.get("Content-Type", "").startswith(MEDIA_TYPE):
+                for frame in read_frames(response.raw):
+                    yield model.from_bytes(frame)
+            else:
+                for line in response.iter_lines():
+                    if line:
+                        yield model.from_json(line.decode("utf-8"))
+    except (requests.RequestException, ValueError) as e:
+        logger.error("GET {} failed [{}]", url, e)
+
+
+def post(url: str, payload: tp.Any, timeout=TIMEOUT) -> tp.Optional[requests.Response]:
+    body, content_type = _encode(payload)
+    headers = {"Content-type": content_type, "Accept": "text/plain"}
+
+    return _wait("POST", url, _submit("POST", url, headers, body, timeout))
+
+
+def gather(
+    urls: tp.List[str], timeout=TIMEOUT
+) -> tp.List[tp.Optional[requests.Response]]:
+    """GET every url concurrently, returning the responses in the same order."""
+    futures = [
+        _submit("GET", url, {"Accept": _accept()}, None, timeout) for url in urls
+    ]
+
+    return [_wait("GET", url, future) for url, future in zip(urls, futures)]
+
+
+def broadcast(
+    urls: tp.List[str], payload: tp.Any, timeout=TIMEOUT
+) -> tp.List[tp.Optional[requests.Response]]:
+    """
+    POST the same payload to every url concurrently, returning the responses in the
+    same order. The payload is serialized only once.
+    """
+    body, content_type = _encode(payload)
+    headers = {"Content-type": content_type, "Accept": "text/plain"}
+
+    futures = [_submit("POST", url, headers, body, timeout) for url in urls]
+
+    return [_wait("POST", url, future) for url, future in zip(urls, futures)]
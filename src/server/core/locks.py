@@ -0,0 +1,95 @@
+import threading
+import typing as tp
+from contextlib import contextmanager
+
+# The number of locks keys are spread over
+STRIPES = 64
+
+
+class LockStripes:
+    """
+    A fixed number of reentrant locks that keys are hashed onto, so that unrelated keys
+    rarely contend while the number of locks stays bounded. Several keys are always
+    locked in the order of their stripes, which rules out deadlocks between threads
+    locking overlapping sets of keys.
+    """
+
+    def __init__(self, n_stripes: int = STRIPES) -> None:
+        self.stripes = [threading.RLock() for _ in range(max(n_stripes, 1))]
+
+    @contextmanager
+    def __call__(self, *keys: tp.Hashable) -> tp.Iterator[None]:
+        indices = sorted({hash(key) % len(self.stripes) for key in keys})
+        locks = [self.stripes[index] for index in indices]
+
+        for lock in locks:
+            lock.acquire()
+        try:
+            yield
+        finally:
+            for lock in reversed(locks):
+                lock.release()
+
+
+class SharedLock:
+    """
+    A lock held either by any number of threads at once or by a single thread
+    exclusively. Once a thread waits for the lock exclusively, threads that do not
+    already share it wait behind it, so that a steady stream of sharers never starves
+    it. Threads already sharing the lock are still let in, so that sharing it
+    reentrantly never deadlocks, and the exclusive owner may share it as well.
+    Sharing the lock and then asking for it exclusively deadlocks, however.
+    """
+
+    def __init__(self) -> None:
+        self.condition = threading.Condition(threading.Lock())
+        self.sharers: tp.Dict[int, int] = {}
+        self.waiting = 0
+        self.owner: tp.Optional[int] = None
+        self.depth = 0
+
+    @contextmanager
+    def shared(self) -> tp.Iterator[None]:
+        ident = threading.get_ident()
+        with self.condition:
+            if self.owner != ident and ident not in self.sharers:
+                self.condition.wait_for(
+                    lambda: self.owner is None and self.waiting == 0
+                )
+
+            self.sharers[ident] = self.sharers.get(ident, 0) + 1
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.sharers[ident] -= 1
+                if self.sharers[ident] == 0:
+                    del self.sharers[ident]
+
+                if not self.sharers:
+                    self.condition.notify_all()
+
+    @contextmanager
+    def exclusive(self) -> tp.Iterator[None]:
+        ident = threading.get_ident()
+        with self.condition:
+            if self.owner != ident:
+                self.waiting += 1
+                try:
+                    self.condition.wait_for(
+                        lambda: self.owner is None and not self.sharers
+                    )
+                finally:
+                    self.waiting -= 1
+
+                self.owner = ident
+
+            self.depth += 1
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.depth -= 1
+                if self.depth == 0:
+                    self.owner = None
+                    self.condition.notify_all()
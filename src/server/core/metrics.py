@@ -0,0 +1,270 @@
+import bisect
+import functools
+import math
+import threading
+import time
+import typing as tp
+from contextlib import contextmanager
+
+# Upper bounds, in seconds, of the buckets of latency histograms
+BUCKETS = (
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+    math.inf,
+)
+
+# The quantiles reported for every histogram
+QUANTILES = (0.5, 0.95, 0.99)
+
+PREFIX = "noobcash_"
+
+
+class Counter:
+    def __init__(self, help: str = "") -> None:
+        self.help = help
+        self.value = 0.0
+        self.lock = threading.Lock()
+
+    def inc(self, amount: float = 1) -> None:
+        with self.lock:
+            self.value += amount
+
+
+class Gauge:
+    def __init__(
+        self, help: str = "", function: tp.Optional[tp.Callable[[], float]] = None
+    ) -> None:
+        self.help = help
+        self.function = function
+        self.current = 0.0
+
+    @property
+    def value(self) -> float:
+        return self.function() if self.function is not None else self.current
+
+    def set(self, value: float) -> None:
+        self.current = value
+
+
+class Histogram:
+    """
+    Counts observations into buckets of increasing upper bounds. Histograms with the
+    same buckets are merged by adding up their counts, after which quantiles are
+    estimated by interpolating linearly within the bucket they fall in.
+    """
+
+    def __init__(self, help: str = "", buckets: tp.Sequence[float] = BUCKETS) -> None:
+        self.help = help
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.sum = 0.0
+        self.lock = threading.Lock()
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+    @property
+    def mean(self) -> float:
+        count = self.count
+
+        return self.sum / count if count else 0.0
+
+    def observe(self, value: float) -> None:
+        with self.lock:
+            self.counts[bisect.bisect_left(self.buckets, value)] += 1
+            self.sum += value
+
+    @contextmanager
+    def time(self) -> tp.Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def quantile(self, q: float) -> float:
+        count = self.count
+        if count == 0:
+            return 0.0
+
+        rank, cumulative = q * count, 0
+        for i, bucket_count in enumerate(self.counts):
+            if cumulative + bucket_count >= rank and bucket_count > 0:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i]
+                if math.isinf(upper):
+                    return lower
+
+                return lower + (upper - lower) * (rank - cumulative) / bucket_count
+
+            cumulative += bucket_count
+
+        return self.buckets[-2]
+
+    def merge(self, other: "Histogram") -> None:
+        if other.buckets != self.buckets:
+            raise ValueError("Merging histograms of different buckets is not supported")
+
+        with self.lock:
+            self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+            self.sum += other.sum
+
+    def to_dict(self) -> tp.Dict[str, tp.Any]:
+        return {
+            "buckets": [str(bucket) for bucket in self.buckets],
+            "counts": list(self.counts),
+            "sum": self.sum,
+            "count": self.count,
+            **{f"p{round(q * 100)}": self.quantile(q) for q in QUANTILES},
+        }
+
+    @classmethod
+    def from_dict(cls, representation: tp.Dict[str, tp.Any]) -> "Histogram":
+        histogram = cls(buckets=[float(bucket) for bucket in representation["buckets"]])
+        histogram.counts = list(representation["counts"])
+        histogram.sum = representation["sum"]
+
+        return histogram
+
+
+class Registry:
+    """The counters, gauges and histograms of a node, created on first use."""
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+
+        self.counters: tp.Dict[str, Counter] = {}
+        self.gauges: tp.Dict[str, Gauge] = {}
+        self.histograms: tp.Dict[str, Histogram] = {}
+
+    def _get(
+        self, metrics: tp.Dict[str, tp.Any], name: str, help: str, factory: tp.Callable
+    ):
+        metric = metrics.get(name)
+        if metric is None:
+            with self.lock:
+                metric = metrics.setdefault(name, factory())
+
+        # Metrics may be looked up before the code describing them has run
+        if help and not metric.help:
+            metric.help = help
+
+        return metric
+
+    def counter(self, name: str, help: str = "") -> Counter:
+        return self._get(self.counters, name, help, lambda: Counter(help))
+
+    def gauge(
+        self,
+        name: str,
+        help: str = "",
+        function: tp.Optional[tp.Callable[[], float]] = None,
+    ) -> Gauge:
+        return self._get(self.gauges, name, help, lambda: Gauge(help, function))
+
+    def histogram(self, name: str, help: str = "") -> Histogram:
+        return self._get(self.histograms, name, help, lambda: Histogram(help))
+
+    def to_dict(self) -> tp.Dict[str, tp.Dict[str, tp.Any]]:
+        return {
+            "counters": {name: c.value for name, c in self.counters.items()},
+            "gauges": {name: g.value for name, g in self.gauges.items()},
+            "histograms": {name: h.to_dict() for name, h in self.histograms.items()},
+        }
+
+    @classmethod
+    def from_dict(
+        cls, representation: tp.Dict[str, tp.Dict[str, tp.Any]]
+    ) -> "Registry":
+        registry = cls()
+
+        for name, value in representation.get("counters", {}).items():
+            registry.counter(name).inc(value)
+
+        for name, value in representation.get("gauges", {}).items():
+            registry.gauge(name).set(value)
+
+        for name, histogram in representation.get("histograms", {}).items():
+            registry.histograms[name] = Histogram.from_dict(histogram)
+
+        return registry
+
+    def merge(self, other: "Registry") -> None:
+        """
+        Add up the counters and histograms of another registry. Gauges measure a level
+        rather than an amount, such as the height of a chain, so the highest is kept.
+        """
+        for name, counter in other.counters.items():
+            self.counter(name, counter.help).inc(counter.value)
+
+        for name, gauge in other.gauges.items():
+            value = gauge.value
+            if name in self.gauges:
+                value = max(self.gauges[name].value, value)
+
+            self.gauge(name, gauge.help).set(value)
+
+        for name, histogram in other.histograms.items():
+            self.histogram(name, histogram.help).merge(histogram)
+
+    def to_prometheus(self) -> str:
+        """Render every metric in the Prometheus text exposition format."""
+        lines = []
+
+        def describe(name: str, kind: str, help: str) -> None:
+            if help:
+                lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        for name, counter in sorted(self.counters.items()):
+            describe(PREFIX + name, "counter", counter.help)
+            lines.append(f"{PREFIX}{name} {counter.value}")
+
+        for name, gauge in sorted(self.gauges.items()):
+            describe(PREFIX + name, "gauge", gauge.help)
+            lines.append(f"{PREFIX}{name} {gauge.value}")
+
+        for name, histogram in sorted(self.histograms.items()):
+            describe(PREFIX + name, "histogram", histogram.help)
+
+            cumulative = 0
+            for bucket, count in zip(histogram.buckets, histogram.counts):
+                cumulative += count
+                bound = "+Inf" if math.isinf(bucket) else repr(bucket)
+                lines.append(f'{PREFIX}{name}_bucket{{le="{bound}"}} {cumulative}')
+
+            lines.append(f"{PREFIX}{name}_sum {histogram.sum}")
+            lines.append(f"{PREFIX}{name}_count {cumulative}")
+
+        return "\n".join(lines) + "\n"
+
+
+def timed(name: str, help: str = "") -> tp.Callable:
+    """Record the latency of a method of an object with a `registry` in a histogram."""
+
+    def decorator(method: tp.Callable) -> tp.Callable:
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with self.registry.histogram(name, help).time():
+                return method(self, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
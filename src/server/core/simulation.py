@@ -0,0 +1,137 @@
+import random
+import threading
+import time
+import typing as tp
+from urllib.parse import urlsplit
+
+import requests
+from core.http import TIMEOUT, Transport, adapt
+from flask import Flask
+
+# Threads are cheap next to the nested requests of nodes sharing a single executor
+MAX_WORKERS = 1024
+
+
+class Link:
+    """One direction of the connection of a node, transmitting a message at a time."""
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.available_at = 0.0
+
+    def transmit(self, size: int, bandwidth: tp.Optional[float]) -> float:
+        """Queue a message of `size` bytes and return when it will have been sent."""
+        now = time.monotonic()
+        if bandwidth is None:
+            return now
+
+        with self.lock:
+            self.available_at = max(now, self.available_at) + size / bandwidth
+
+            return self.available_at
+
+
+class InMemoryTransport(Transport):
+    """
+    Delivers requests straight to the applications of nodes running in the same
+    process. Every message is delayed by a latency with a uniformly distributed
+    jitter and queued on the link into or out of a node of limited bandwidth, while
+    a fraction of the requests is dropped before ever reaching its destination.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        loss: float = 0.0,
+        bandwidth: tp.Optional[float] = None,
+        seed: tp.Optional[int] = None,
+        max_workers: int = MAX_WORKERS,
+    ) -> None:
+        super().__init__(max_workers)
+
+        self.latency = latency
+        self.jitter = jitter
+        self.loss = loss
+        self.bandwidth = bandwidth
+        self.random = random.Random(seed)
+
+        self.lock = threading.Lock()
+        self.clients: tp.Dict[str, tp.Any] = {}
+        self.listening: tp.Dict[str, threading.Event] = {}
+        self.links: tp.Dict[tp.Tuple[str, str], Link] = {}
+
+        self.counters = {"requests": 0, "dropped": 0, "bytes": 0}
+
+    def reserve(self, address: str) -> None:
+        """Hold the requests to a node that is about to start until it listens."""
+        with self.lock:
+            self.listening.setdefault(address, threading.Event())
+
+    def listen(self, address: str, app: Flask) -> None:
+        self.reserve(address)
+
+        self.clients[address] = app.test_client(use_cookies=False)
+        self.listening[address].set()
+
+    def _delay(self, address: str, direction: str, size: int) -> float:
+        with self.lock:
+            link = self.links.setdefault((address, direction), Link())
+            self.counters["bytes"] += size
+
+        sent_at = link.transmit(size, self.bandwidth)
+
+        return sent_at + self.latency + self.random.uniform(0, self.jitter)
+
+    @staticmethod
+    def _wait(until: float, timeout: float) -> None:
+        delay = until - time.monotonic()
+        if delay > timeout:
+            time.sleep(timeout)
+            raise requests.Timeout(f"Timed out after {timeout} seconds")
+
+        if delay > 0:
+            time.sleep(delay)
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        headers: tp.Dict[str, str],
+        data: tp.Optional[tp.Union[str, bytes]] = None,
+        timeout=TIMEOUT,
+        stream: bool = False,
+    ) -> requests.Response:
+        connect_timeout, read_timeout = (
+            timeout if isinstance(timeout, tuple) else (timeout, timeout)
+        )
+
+        parts = urlsplit(url)
+        address = f"{parts.scheme}://{parts.netloc}"
+
+        event = self.listening.get(address)
+        if event is None or not event.wait(connect_timeout):
+            raise requests.ConnectionError(f"Nothing listens at {address}")
+
+        with self.lock:
+            self.counters["requests"] += 1
+
+            dropped = self.random.random() < self.loss
+            if dropped:
+                self.counters["dropped"] += 1
+
+        if dropped:
+            raise requests.ConnectionError(f"Dropped request to {url}")
+
+        body = data.encode("utf-8") if isinstance(data, str) else data or b""
+        self._wait(self._delay(address, "in", len(body)), read_timeout)
+
+        path = parts.path + (f"?{parts.query}" if parts.query else "")
+        response = self.clients[address].open(
+            path, method=method, headers=headers, data=body
+        )
+        content = response.get_data()
+
+        self._wait(self._delay(address, "out", len(content)), read_timeout)
+
+        return adapt(url, response.status_code, response.headers.items(), content)
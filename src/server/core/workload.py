@@ -0,0 +1,170 @@
+import threading
+import time
+import typing as tp
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from core.metrics import QUANTILES, Histogram, Registry
+
+# Seconds between two checks of whether pending transactions have been confirmed
+POLL_INTERVAL = 0.05
+
+# Seconds to wait for the last transactions to be confirmed
+CONFIRMATION_TIMEOUT = 60.0
+
+# The fraction of the target rate below which the workload counts as saturated
+SATURATION = 0.95
+
+
+def read_transactions(path: Path) -> tp.Iterator[tp.Tuple[int, int]]:
+    """Lazily parse lines of the form `id<node> <amount>` into pairs of integers."""
+    with path.open("r") as file:
+        for line in file:
+            fields = line.split()
+            if not fields:
+                continue
+
+            node_id, amount = fields
+            yield int(node_id[2:]), int(amount)
+
+
+class Workload:
+    """
+    Issues transactions in an open loop, meaning they arrive at a target rate no matter
+    how long earlier ones take, with at most `concurrency` of them being submitted at
+    any time. Arrivals that find every slot taken are delayed, so a workload that falls
+    behind its rate has saturated the node. Submitted transactions are then polled for
+    until they are confirmed, recording the latency from submission to confirmation.
+    """
+
+    def __init__(
+        self,
+        submit: tp.Callable[[int, int], tp.Optional[str]],
+        confirmed: tp.Callable[[str], bool],
+        rate: tp.Optional[float] = None,
+        concurrency: int = 1,
+        registry: tp.Optional[Registry] = None,
+        poll_interval: float = POLL_INTERVAL,
+        confirmation_timeout: float = CONFIRMATION_TIMEOUT,
+    ) -> None:
+        self.submit = submit
+        self.confirmed = confirmed
+        self.rate = rate
+        self.concurrency = max(concurrency, 1)
+        self.poll_interval = poll_interval
+        self.confirmation_timeout = confirmation_timeout
+
+        registry = registry if registry is not None else Registry()
+        self.submission: Histogram = registry.histogram(
+            "workload_submission_seconds", "Time spent submitting a transaction"
+        )
+        self.confirmation: Histogram = registry.histogram(
+            "workload_confirmation_seconds",
+            "Time from submitting a transaction until it is part of the chain",
+        )
+
+        self.lock = threading.Lock()
+        self.pending: tp.Dict[str, float] = {}
+        self.counters = {"successful": 0, "failed": 0, "confirmed": 0, "throughput": 0}
+        self.last_confirmation: tp.Optional[float] = None
+
+    def _issue(self, node_id: int, amount: int, slots: threading.Semaphore) -> None:
+        try:
+            start = time.monotonic()
+            transaction_id = self.submit(node_id, amount)
+            self.submission.observe(time.monotonic() - start)
+
+            with self.lock:
+                if transaction_id is None:
+                    self.counters["failed"] += 1
+                else:
+                    self.counters["successful"] += 1
+                    self.pending[transaction_id] = start
+        finally:
+            slots.release()
+
+    def _poll(self, submitted: threading.Event) -> None:
+        deadline = None
+        while True:
+            with self.lock:
+                pending = list(self.pending.items())
+
+            for transaction_id, start in pending:
+                if not self.confirmed(transaction_id):
+                    continue
+
+                self.confirmation.observe(time.monotonic() - start)
+
+                with self.lock:
+                    del self.pending[transaction_id]
+                    self.counters["confirmed"] += 1
+
+                self.last_confirmation = time.monotonic()
+
+            if submitted.is_set():
+                if deadline is None:
+                    deadline = time.monotonic() + self.confirmation_timeout
+
+                if not self.pending or time.monotonic() > deadline:
+                    return
+
+            time.sleep(self.poll_interval)
+
+    def run(
+        self, transactions: tp.Iterable[tp.Tuple[int, int]]
+    ) -> tp.Dict[str, tp.Any]:
+        slots = threading.Semaphore(self.concurrency)
+        submitted = threading.Event()
+
+        poller = threading.Thread(target=self._poll, args=(submitted,), daemon=True)
+        poller.start()
+
+        start = time.monotonic()
+        n_transactions, lag = 0, 0.0
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            for node_id, amount in transactions:
+                if self.rate:
+                    arrival = start + n_transactions / self.rate
+                    time.sleep(max(arrival - time.monotonic(), 0))
+
+                # Transactions are read one slot at a time rather than queued up front
+                slots.acquire()
+                if self.rate:
+                    lag = max(time.monotonic() - arrival, 0)
+
+                executor.submit(self._issue, node_id, amount, slots)
+                n_transactions += 1
+
+        elapsed = time.monotonic() - start
+        submitted.set()
+        poller.join()
+
+        throughput = n_transactions / elapsed if elapsed > 0 else 0.0
+        self.counters["throughput"] = throughput
+
+        # Falling behind the target rate means the node cannot keep up with it
+        saturated = self.rate is None or throughput < SATURATION * self.rate
+
+        confirmation_elapsed = (
+            self.last_confirmation - start if self.last_confirmation is not None else 0
+        )
+
+        return {
+            **self.counters,
+            "unconfirmed": len(self.pending),
+            "elapsed": elapsed,
+            "target_rate": self.rate,
+            "concurrency": self.concurrency,
+            "lag": lag,
+            "saturated": saturated,
+            "saturation_throughput": throughput if saturated else None,
+            "confirmed_throughput": self.counters["confirmed"] / confirmation_elapsed
+            if confirmation_elapsed > 0
+            else 0.0,
+            "submission_latency": {
+                f"p{round(q * 100)}": self.submission.quantile(q) for q in QUANTILES
+            },
+            "confirmation_latency": {
+                f"p{round(q * 100)}": self.confirmation.quantile(q) for q in QUANTILES
+            },
+        }
@@ -1,8 +1,11 @@
+import typing as tp
 from pathlib import Path
 
 import rich_click as click
 import waitress
+from components import crypto
 from components.node import Bootstrap, Peer
+from core import aio, http
 from core.blueprint import register_blueprints
 from core.logging import setup_logging
 from flask import Flask, jsonify, request
@@ -11,6 +14,53 @@ from loguru import logger
 from werkzeug.exceptions import HTTPException
 
 
+def build_app(ipv6: bool = False, verbose: bool = False) -> Flask:
+    """Create the application serving the API of a node, which is set as `app.node`."""
+    app = Flask(__name__)
+    app.config.update(USE_IPV6=ipv6)
+    CORS(app)
+
+    register_blueprints(app, "api")
+
+    @app.before_request
+    def _():
+        logger.info(
+            "{}: {} - {}",
+            request.remote_addr,
+            request.method,
+            request.full_path,
+        )
+
+    if verbose is True:
+
+        @app.after_request
+        def _(response):
+            logger.info(
+                "{}: {} - {} [{}] {}",
+                request.remote_addr,
+                request.method,
+                request.full_path,
+                response.status,
+                response.data.decode("utf-8"),
+            )
+            return response
+
+    @app.errorhandler(Exception)
+    def _(error):
+        code, message = 500, str(error)
+
+        if isinstance(error, HTTPException):
+            code, message = error.code, error.description
+
+            logger.error("HTTP Exception: ({}) {}", code, message)
+        else:
+            logger.exception("Unexpected error: {}", error)
+
+        return jsonify({"message": message}), code, {"ContentType": "application/json"}
+
+    return app
+
+
 @click.command()
 @click.option(
     "-6",
@@ -52,6 +102,65 @@ from werkzeug.exceptions import HTTPException
     show_default=True,
     help="The difficulty of mining a new block",
 )
+@click.option(
+    "-m",
+    "--miners",
+    type=int,
+    default=1,
+    show_default=True,
+    help="The number of processes mining each block",
+)
+@click.option(
+    "-v",
+    "--validators",
+    type=int,
+    default=1,
+    show_default=True,
+    help="The number of processes validating received chains",
+)
+@click.option(
+    "--batch-window",
+    type=float,
+    default=0.05,
+    show_default=True,
+    help="Seconds to buffer outgoing transactions for before broadcasting them",
+)
+@click.option(
+    "--batch-size",
+    type=int,
+    default=100,
+    show_default=True,
+    help="The maximum number of transactions broadcast at once",
+)
+@click.option(
+    "-w",
+    "--wire-format",
+    type=click.Choice(["json", "binary"]),
+    default="json",
+    show_default=True,
+    help="The encoding of blocks and transactions exchanged between nodes",
+)
+@click.option(
+    "-s",
+    "--scheme",
+    type=click.Choice(sorted(crypto.SCHEMES)),
+    default="rsa",
+    show_default=True,
+    help="The signature scheme of the cluster, which every node has to agree on",
+)
+@click.option(
+    "--mempool-size",
+    type=int,
+    default=10000,
+    show_default=True,
+    help="The maximum number of pending transactions",
+)
+@click.option(
+    "--max-block-wait",
+    type=float,
+    default=None,
+    help="Seconds to wait for a block to fill up before mining it partially full",
+)
 @click.option(
     "-n",
     "--nodes",
@@ -68,6 +177,39 @@ from werkzeug.exceptions import HTTPException
     ),
     help="A plain-text file to read transactions from",
 )
+@click.option(
+    "--workload-rate",
+    type=float,
+    default=None,
+    help="Transactions per second to create from the file, or as many as possible",
+)
+@click.option(
+    "--workload-concurrency",
+    type=int,
+    default=1,
+    show_default=True,
+    help="The maximum number of transactions of the file being created at once",
+)
+@click.option(
+    "--data-dir",
+    type=click.Path(file_okay=False, dir_okay=True, writable=True, path_type=Path),
+    default=None,
+    help="A directory to persist the blockchain in, which is kept in memory otherwise",
+)
+@click.option(
+    "--snapshot-interval",
+    type=int,
+    default=100,
+    show_default=True,
+    help="The number of blocks between snapshots of the unspent outputs",
+)
+@click.option(
+    "--runtime",
+    type=click.Choice(["threaded", "async"]),
+    default="threaded",
+    show_default=True,
+    help="Serve and reach peers from a pool of threads or from an event loop",
+)
 @click.option(
     "--debug",
     default=True,
@@ -88,54 +230,33 @@ def create_app(
     bootstrap: str,
     capacity: int,
     difficulty: int,
+    miners: int,
+    validators: int,
+    batch_window: float,
+    batch_size: int,
+    wire_format: str,
+    scheme: str,
+    mempool_size: int,
+    max_block_wait: tp.Optional[float],
     nodes: int,
     transactions: Path,
+    workload_rate: tp.Optional[float],
+    workload_concurrency: int,
+    data_dir: Path,
+    snapshot_interval: int,
+    runtime: str,
     debug: bool,
     verbose: bool,
 ):
-    app = Flask(__name__)
-    app.config.update(USE_IPV6=ipv6)
-    CORS(app)
-
     setup_logging()
 
-    register_blueprints(app, "api")
-
-    @app.before_request
-    def _():
-        logger.info(
-            "{}: {} - {}",
-            request.remote_addr,
-            request.method,
-            request.full_path,
-        )
-
-    if verbose is True:
+    http.use_binary(wire_format == "binary")
+    crypto.use_scheme(scheme)
 
-        @app.after_request
-        def _(response):
-            logger.info(
-                "{}: {} - {} [{}] {}",
-                request.remote_addr,
-                request.method,
-                request.full_path,
-                response.status,
-                response.data.decode("utf-8"),
-            )
-            return response
-
-    @app.errorhandler(Exception)
-    def _(error):
-        code, message = 500, str(error)
-
-        if isinstance(error, HTTPException):
-            code, message = error.code, error.description
-
-            logger.error("HTTP Exception: ({}) {}", code, message)
-        else:
-            logger.exception("Unexpected error: {}", error)
+    if runtime == "async":
+        http.use_transport(aio.AsyncTransport())
 
-        return jsonify({"message": message}), code, {"ContentType": "application/json"}
+    app = build_app(ipv6, verbose)
 
     ip = "[::]" if ipv6 else "0.0.0.0"
     if bootstrap is not None:
@@ -144,9 +265,19 @@ def create_app(
             port=port,
             capacity=capacity,
             difficulty=difficulty,
+            miners=miners,
+            validators=validators,
+            batch_window=batch_window,
+            batch_size=batch_size,
+            mempool_size=mempool_size,
+            max_block_wait=max_block_wait,
             n_nodes=nodes,
             bootstrap_address=bootstrap,
             transactions_filepath=transactions,
+            workload_rate=workload_rate,
+            workload_concurrency=workload_concurrency,
+            data_directory=data_dir,
+            snapshot_interval=snapshot_interval,
             debug=debug,
         )
     else:
@@ -155,15 +286,28 @@ def create_app(
             port=port,
             capacity=capacity,
             difficulty=difficulty,
+            miners=miners,
+            validators=validators,
+            batch_window=batch_window,
+            batch_size=batch_size,
+            mempool_size=mempool_size,
+            max_block_wait=max_block_wait,
             n_nodes=nodes,
             id=0,
             transactions_filepath=transactions,
+            workload_rate=workload_rate,
+            workload_concurrency=workload_concurrency,
+            data_directory=data_dir,
+            snapshot_interval=snapshot_interval,
             debug=debug,
         )
 
     logger.info("Serving at {}:{}", ip, port)
 
-    waitress.serve(app, host=ip, port=port, threads=10)
+    if runtime == "async":
+        aio.serve(app, host=ip, port=port)
+    else:
+        waitress.serve(app, host=ip, port=port, threads=10)
 
 
 if __name__ == "__main__":
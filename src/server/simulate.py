@@ -0,0 +1,369 @@
+import json
+import os
+import random
+import sys
+import threading
+import time
+import typing as tp
+from pathlib import Path
+
+import rich_click as click
+from components import crypto
+from components.node import Bootstrap, Node, Peer
+from core import http
+from core.cli import integers
+from core.logging import setup_logging
+from core.simulation import InMemoryTransport
+from loguru import logger
+from main import build_app
+from rich.console import Console
+from rich.table import Table
+
+# The address of the first simulated node, which the others increment the port of
+HOST, PORT = "127.0.0.1", 5000
+
+console = Console()
+
+
+def start(
+    transport: InMemoryTransport, n_nodes: int, port: int, **options: tp.Any
+) -> tp.List[Node]:
+    """Start a bootstrap node and its peers, serving them over the transport."""
+    bootstrap_address = f"http://{HOST}:{port}"
+
+    nodes = []
+    for i in range(n_nodes):
+        address = f"http://{HOST}:{port + i}"
+
+        # Peers register as soon as they are constructed and are enrolled by the last
+        transport.reserve(address)
+
+        app = build_app()
+        if i == 0:
+            app.node = Bootstrap(ip=HOST, port=port, n_nodes=n_nodes, id=0, **options)
+        else:
+            app.node = Peer(
+                ip=HOST,
+                port=port + i,
+                n_nodes=n_nodes,
+                bootstrap_address=bootstrap_address,
+                **options,
+            )
+
+        transport.listen(address, app)
+
+        nodes.append(app.node)
+
+    return nodes
+
+
+def transmit(
+    node: Node,
+    n_transactions: int,
+    rate: float,
+    timeout: float,
+    created: tp.Dict[str, float],
+    failed: tp.List[str],
+) -> None:
+    """Send transactions of a single coin to random peers at a fixed rate."""
+    if not node.ready.wait(timeout):
+        logger.error("Node {} never became ready", node.id)
+        return
+
+    recipients = [
+        public_key
+        for _, public_key in node.network
+        if public_key != node.wallet.public_key
+    ]
+
+    # The schedule is kept regardless of how long transactions take to be created
+    start = time.monotonic()
+    for i in range(n_transactions):
+        if rate > 0:
+            time.sleep(max(start + i / rate - time.monotonic(), 0))
+
+        result = node.create_transaction(random.choice(recipients), 1)
+        if result:
+            created[result.payload.id] = time.monotonic()
+        else:
+            failed.append(result.error.message)
+
+
+def percentile(values: tp.List[float], q: float) -> float:
+    if not values:
+        return 0.0
+
+    values = sorted(values)
+
+    return values[min(int(q * len(values)), len(values) - 1)]
+
+
+def simulate(
+    n_nodes: int,
+    n_transactions: int,
+    rate: float,
+    timeout: float,
+    transport: InMemoryTransport,
+    port: int = PORT,
+    **options: tp.Any,
+) -> tp.Dict[str, tp.Any]:
+    http.use_transport(transport)
+
+    nodes = start(transport, n_nodes, port, **options)
+    reference = nodes[0]
+
+    created: tp.Dict[str, float] = {}
+    failed: tp.List[str] = []
+
+    threads = [
+        threading.Thread(
+            target=transmit,
+            args=(node, n_transactions, rate, timeout, created, failed),
+            daemon=True,
+        )
+        for node in nodes
+    ]
+    for thread in threads:
+        thread.start()
+
+    if not all(node.ready.wait(timeout) for node in nodes):
+        logger.error("The network of {} nodes failed to form", n_nodes)
+
+    began = time.monotonic()
+
+    # Transactions are confirmed once they are part of the chain of the bootstrap node
+    confirmed: tp.Dict[str, float] = {}
+    deadline = None
+    while True:
+        now = time.monotonic()
+        for transaction_id in list(created):
+            if transaction_id in confirmed:
+                continue
+
+            if reference.index.locate(transaction_id) is not None:
+                confirmed[transaction_id] = now
+
+        if deadline is None and not any(thread.is_alive() for thread in threads):
+            deadline = now + timeout
+
+        if deadline is not None and (len(confirmed) == len(created) or now > deadline):
+            break
+
+        time.sleep(0.01)
+
+    # Transactions of abandoned forks are no longer part of the chain
+    confirmed = {
+        transaction_id: at
+        for transaction_id, at in confirmed.items()
+        if reference.index.locate(transaction_id) is not None
+    }
+    latencies = [
+        at - created[transaction_id] for transaction_id, at in confirmed.items()
+    ]
+    elapsed = (max(confirmed.values()) - began) if confirmed else 0.0
+
+    tip = reference.tip
+    height = tip.height
+    mined = sum(node.registry.counter("blocks_mined_total").value for node in nodes)
+
+    return {
+        "nodes": n_nodes,
+        "submitted": len(created) + len(failed),
+        "failed": len(failed),
+        "confirmed": len(confirmed),
+        "throughput": len(confirmed) / elapsed if elapsed > 0 else 0.0,
+        "latency": {
+            f"p{round(q * 100)}": percentile(latencies, q) for q in (0.5, 0.95, 0.99)
+        },
+        "height": height,
+        "blocks_mined": mined,
+        "fork_rate": 1 - (height - 1) / mined if mined else 0.0,
+        # Nodes that lost the genesis block to the network have no tip at all
+        "converged": sum(
+            node.tip is not None
+            and node.tip.block.current_hash == tip.block.current_hash
+            for node in nodes
+        )
+        / n_nodes,
+        "transport": dict(transport.counters),
+    }
+
+
+@click.command()
+@click.option(
+    "-n",
+    "--nodes",
+    default="2,5,10",
+    show_default=True,
+    callback=integers,
+    help="The comma-separated numbers of nodes to simulate, one network at a time",
+)
+@click.option(
+    "-t",
+    "--transactions",
+    type=int,
+    default=10,
+    show_default=True,
+    help="The number of transactions sent by every node",
+)
+@click.option(
+    "-r",
+    "--rate",
+    type=float,
+    default=0,
+    show_default=True,
+    help="The transactions per second sent by every node, or as many as possible",
+)
+@click.option("-c", "--capacity", type=int, default=5, show_default=True)
+@click.option("-d", "--difficulty", type=int, default=3, show_default=True)
+@click.option(
+    "--max-block-wait",
+    type=float,
+    default=1.0,
+    show_default=True,
+    help="Seconds to wait for a block to fill up before mining it partially full",
+)
+@click.option(
+    "--latency",
+    type=float,
+    default=0.01,
+    show_default=True,
+    help="Seconds every message takes to reach its destination",
+)
+@click.option(
+    "--jitter",
+    type=float,
+    default=0.005,
+    show_default=True,
+    help="The maximum number of seconds randomly added to the latency",
+)
+@click.option(
+    "--loss",
+    type=float,
+    default=0.0,
+    show_default=True,
+    help="The fraction of requests dropped",
+)
+@click.option(
+    "--bandwidth",
+    type=float,
+    default=None,
+    help="The bytes per second every node sends and receives, unlimited by default",
+)
+@click.option(
+    "-w",
+    "--wire-format",
+    type=click.Choice(["json", "binary"]),
+    default="json",
+    show_default=True,
+)
+@click.option(
+    "-s",
+    "--scheme",
+    type=click.Choice(sorted(crypto.SCHEMES)),
+    default="rsa",
+    show_default=True,
+    help="The signature scheme of the cluster, which every node has to agree on",
+)
+@click.option("--seed", type=int, default=None)
+@click.option(
+    "--timeout",
+    type=float,
+    default=60,
+    show_default=True,
+    help="Seconds to wait for the network to form and for transactions to settle",
+)
+@click.option(
+    "-o",
+    "--output",
+    type=click.Path(dir_okay=False, writable=True, path_type=Path),
+    default=None,
+    help="A file to write the results to, as JSON",
+)
+@click.option("--verbose", default=False, is_flag=True, help="Log every node")
+def main(
+    nodes: tp.List[int],
+    transactions: int,
+    rate: float,
+    capacity: int,
+    difficulty: int,
+    max_block_wait: float,
+    latency: float,
+    jitter: float,
+    loss: float,
+    bandwidth: tp.Optional[float],
+    wire_format: str,
+    scheme: str,
+    seed: tp.Optional[int],
+    timeout: float,
+    output: tp.Optional[Path],
+    verbose: bool,
+):
+    """
+    Simulate networks of growing size within a single process, where nodes exchange
+    messages over an in-memory transport instead of HTTP.
+    """
+    if verbose:
+        setup_logging()
+    else:
+        logger.remove()
+
+    random.seed(seed)
+
+    http.use_binary(wire_format == "binary")
+    crypto.use_scheme(scheme)
+
+    results = []
+    for i, n_nodes in enumerate(nodes):
+        with console.status(f"Simulating {n_nodes} nodes"):
+            results.append(
+                simulate(
+                    n_nodes,
+                    transactions,
+                    rate,
+                    timeout,
+                    InMemoryTransport(latency, jitter, loss, bandwidth, seed),
+                    # Nodes of earlier networks are left idle on addresses of their own
+                    port=PORT + sum(nodes[:i]),
+                    capacity=capacity,
+                    difficulty=difficulty,
+                    max_block_wait=max_block_wait,
+                )
+            )
+
+    table = Table(
+        "Nodes",
+        "Confirmed",
+        "Tx/s",
+        "p50 (ms)",
+        "p95 (ms)",
+        "p99 (ms)",
+        "Blocks",
+        "Forks",
+        "Converged",
+        "Dropped",
+    )
+    for result in results:
+        table.add_row(
+            str(result["nodes"]),
+            f"{result['confirmed']}/{result['submitted']}",
+            f"{result['throughput']:.1f}",
+            *(f"{result['latency'][p] * 1000:.0f}" for p in ("p50", "p95", "p99")),
+            str(result["height"]),
+            f"{result['fork_rate']:.1%}",
+            f"{result['converged']:.0%}",
+            str(result["transport"]["dropped"]),
+        )
+
+    console.print(table)
+
+    if output is not None:
+        output.write_text(json.dumps(results, indent=2))
+
+    # The mining threads of the simulated nodes never finish
+    sys.stdout.flush()
+    os._exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from components.block import Block
+from components.blockchain import Blockchain
+from core.codec import MEDIA_TYPE
+from main import build_app
+
+
+@pytest.fixture
+def client():
+    app = build_app()
+
+    # Nodes mine from a thread of their own, so the API is served a stand-in
+    app.node = SimpleNamespace(id=0, blockchain=Blockchain(blocks=[]))
+
+    return app.test_client()
+
+
+def test_inverted_block_range_is_a_bad_request(client):
+    response = client.get("/blockchain/?from=5&to=2")
+
+    assert response.status_code == 400
+    assert "Invalid block range [5, 2)" in response.get_data(as_text=True)
+
+
+@pytest.mark.parametrize("route", ["/blocks/broadcast", "/transactions/broadcast"])
+def test_malformed_binary_body_is_a_bad_request(client, route):
+    block = Block(index=1, timestamp=datetime.utcnow(), nonce=0, previous_hash="1")
+
+    for body in (block.to_bytes()[:5], b"\xff" * 16):
+        response = client.post(route, data=body, content_type=MEDIA_TYPE)
+
+        assert response.status_code == 400
+        assert "Malformed" in response.get_data(as_text=True)
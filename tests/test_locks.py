@@ -0,0 +1,63 @@
+import threading
+import time
+
+from core.locks import SharedLock
+
+
+def test_sharers_do_not_starve_an_exclusive_holder():
+    lock, stop = SharedLock(), threading.Event()
+
+    def share() -> None:
+        while not stop.is_set():
+            with lock.shared():
+                time.sleep(0.001)
+
+    sharers = [threading.Thread(target=share) for _ in range(10)]
+    for sharer in sharers:
+        sharer.start()
+
+    acquired = threading.Event()
+
+    def hold() -> None:
+        with lock.exclusive():
+            acquired.set()
+
+    time.sleep(0.05)
+    threading.Thread(target=hold, daemon=True).start()
+
+    try:
+        assert acquired.wait(5)
+    finally:
+        stop.set()
+        for sharer in sharers:
+            sharer.join()
+
+
+def test_sharing_reentrantly_while_an_exclusive_holder_waits():
+    lock, waiting = SharedLock(), threading.Event()
+
+    def hold() -> None:
+        waiting.set()
+        with lock.exclusive():
+            pass
+
+    with lock.shared():
+        holder = threading.Thread(target=hold)
+        holder.start()
+
+        waiting.wait()
+        while not lock.waiting:
+            time.sleep(0.001)
+
+        with lock.shared():
+            pass
+
+    holder.join(5)
+    assert not holder.is_alive()
+
+
+def test_the_exclusive_holder_may_share():
+    lock = SharedLock()
+
+    with lock.exclusive(), lock.shared(), lock.exclusive():
+        assert lock.depth == 2
@@ -0,0 +1,65 @@
+import pytest
+from components.mempool import Mempool
+from components.merkle import MerkleTree
+from components.transaction import Transaction
+
+
+def transaction(id, inputs):
+    return Transaction.construct(
+        sender_address="aa",
+        recipient_address="bb",
+        amount=1,
+        id=id,
+        transaction_inputs=inputs,
+        transaction_outputs=[(f"{id}:0", id, "bb", 1)],
+        signature="00",
+    )
+
+
+def root(transactions):
+    return MerkleTree(t.json().encode("utf-8") for t in transactions).root()
+
+
+@pytest.fixture
+def mempool():
+    # The second transaction spends the output of the first
+    mempool = Mempool(max_size=4)
+    for t in [
+        transaction("a", ["0:0"]),
+        transaction("b", ["a:0"]),
+        transaction("c", ["1:0"]),
+        transaction("d", ["2:0"]),
+    ]:
+        mempool.add(t, [])
+
+    return mempool
+
+
+def test_make_room_evicts_the_oldest_along_with_its_descendants(mempool):
+    evicted = mempool.make_room()
+
+    assert [t.id for t, _ in evicted] == ["b", "a"]
+    assert list(mempool.entries) == ["c", "d"]
+    assert mempool.spent == {"1:0": "c", "2:0": "d"}
+
+    transactions, merkle_root = mempool.snapshot()
+    assert merkle_root == root(transactions)
+
+
+def test_root_follows_removals_and_rollbacks(mempool):
+    checkpoint = mempool.checkpoint()
+    before = mempool.snapshot()
+
+    mempool.remove(["c"])
+    mempool.discard_conflicts(transaction("x", ["0:0"]))
+
+    transactions, merkle_root = mempool.snapshot()
+    assert [t.id for t in transactions] == ["d"]
+    assert merkle_root == root(transactions)
+
+    mempool.add(transaction("e", ["3:0"]), [])
+    transactions, merkle_root = mempool.snapshot()
+    assert merkle_root == root(transactions)
+
+    mempool.rollback(checkpoint)
+    assert mempool.snapshot() == before
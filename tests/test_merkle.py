@@ -0,0 +1,75 @@
+from datetime import datetime
+
+import pytest
+from components import crypto
+from components.block import Block
+from components.merkle import MerkleTree
+from components.transaction import Transaction
+from components.validator import validate_block
+from components.wallet import Wallet
+
+
+@pytest.fixture
+def wallets():
+    # Ed25519 keys are generated in about a millisecond
+    crypto.use_scheme("ed25519")
+    yield Wallet.generate_wallet(), Wallet.generate_wallet()
+    crypto.use_scheme("rsa")
+
+
+def block(transactions):
+    block = Block(
+        index=1,
+        timestamp=datetime.utcnow(),
+        nonce=0,
+        previous_hash="1",
+        transactions=transactions,
+    )
+    block.merkle_root = Block.merkle_tree(transactions).root()
+    block.current_hash = Block.calculate_hash(block)
+
+    return block
+
+
+@pytest.mark.parametrize("n_leaves", range(1, 17))
+def test_proofs(n_leaves):
+    leaves = [bytes([leaf]) for leaf in range(n_leaves)]
+    tree = MerkleTree(leaves)
+
+    for size in range(1, n_leaves + 1):
+        root = tree.root(size)
+        assert root == MerkleTree(leaves[:size]).root()
+
+        for index in range(size):
+            assert MerkleTree.verify(leaves[index], tree.proof(index, size), root)
+
+
+@pytest.mark.parametrize("n_leaves", [3, 5, 6, 7])
+def test_repeated_leaves_change_the_root(n_leaves):
+    leaves = [bytes([leaf]) for leaf in range(n_leaves)]
+
+    assert MerkleTree(leaves).root() != MerkleTree(leaves + leaves[-1:]).root()
+    assert MerkleTree(leaves).root() != MerkleTree(leaves + leaves[-2:]).root()
+
+
+def test_block_with_a_repeated_transaction_is_rejected(wallets):
+    sender, recipient = wallets
+    transactions = [
+        Transaction.create_transaction(
+            sender.public_key,
+            recipient.public_key,
+            1,
+            [f"{index}:0"],
+            [],
+            sender.private_key,
+        )
+        for index in range(3)
+    ]
+
+    original = block(transactions)
+    assert validate_block(original, "1")
+
+    # Repeating the last transaction of an odd level must not preserve the header
+    mutated = original.copy(update={"transactions": transactions + transactions[-1:]})
+    assert Block.merkle_tree(mutated.transactions).root() != original.merkle_root
+    assert not validate_block(mutated, "1")
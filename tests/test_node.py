@@ -0,0 +1,86 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+from components.block import Block
+from components.blockchain import Blockchain
+from components.index import ChainIndex
+from components.node import Node
+from components.validator import ChainValidator
+from core import http
+
+PEER = "http://127.0.0.1:5001"
+
+
+def chain(n_blocks):
+    blocks = []
+    for index in range(n_blocks):
+        block = Block(
+            index=index,
+            timestamp=datetime.utcnow(),
+            nonce=0,
+            previous_hash=blocks[-1].current_hash if blocks else "1",
+        )
+        block.merkle_root = Block.merkle_tree(block.transactions).root()
+        block.current_hash = Block.calculate_hash(block)
+
+        blocks.append(block)
+
+    return blocks
+
+
+def node(blocks):
+    # Constructed without starting the mining thread
+    return Node.construct(
+        blockchain=Blockchain(blocks=list(blocks)),
+        index=ChainIndex(blocks),
+        network=[(PEER, "peer"), ("http://127.0.0.1:5000", "self")],
+        wallet=SimpleNamespace(public_key="self"),
+        validator=ChainValidator(),
+    )
+
+
+def test_peer_chain_that_is_a_prefix_of_ours_is_ignored(monkeypatch):
+    blocks = chain(3)
+    ours = node(blocks[:2])
+
+    requested = []
+
+    def stream(url, model):
+        requested.append(url)
+
+        # Our chain grows while the peer is being surveyed
+        ours.blockchain.blocks.append(blocks[2])
+        ours.index.append(blocks[2])
+
+        for block in blocks:
+            yield block.to_header()
+
+    monkeypatch.setattr(http, "stream", stream)
+
+    ours.resolve_conflict()
+
+    assert requested == [f"{PEER}/blockchain/?headers=true"]
+    assert len(ours.blockchain.blocks) == 3
+
+
+def test_peer_header_without_merkle_root_is_rejected(monkeypatch):
+    blocks = chain(2)
+    ours = node(blocks[:1])
+
+    header = blocks[1].to_header()
+    header.merkle_root = None
+
+    requested = []
+
+    def stream(url, model):
+        requested.append(url)
+
+        yield blocks[0].to_header()
+        yield header
+
+    monkeypatch.setattr(http, "stream", stream)
+
+    ours.resolve_conflict()
+
+    assert requested == [f"{PEER}/blockchain/?headers=true"]
+    assert len(ours.blockchain.blocks) == 1
@@ -0,0 +1,55 @@
+import pytest
+from components.transaction import Transaction
+from components.utxo import UTXOSet
+
+
+def transaction(id, inputs, outputs):
+    return Transaction.construct(
+        sender_address="aa",
+        recipient_address="bb",
+        amount=outputs[0][3],
+        id=id,
+        transaction_inputs=inputs,
+        transaction_outputs=outputs,
+        signature="00",
+    )
+
+
+@pytest.fixture
+def utxos():
+    return UTXOSet([("0:0", "0", "aa", 100), ("1:0", "1", "bb", 200)])
+
+
+def test_apply_and_revert(utxos):
+    spending = transaction(
+        "2", ["0:0"], [("2:0", "2", "bb", 5), ("2:1", "2", "aa", 95)]
+    )
+
+    spent = utxos.apply(spending)
+    assert utxos.balance("aa") == 95 and utxos.balance("bb") == 205
+
+    utxos.revert(spending, spent)
+    assert sorted(utxos) == [("0:0", "0", "aa", 100), ("1:0", "1", "bb", 200)]
+
+
+@pytest.mark.parametrize(
+    "inputs, outputs",
+    [
+        # An output id colliding with an unspent output
+        (["0:0"], [("1:0", "2", "bb", 5), ("2:1", "2", "aa", 95)]),
+        # The same output credited twice
+        (["0:0"], [("2:0", "2", "bb", 5), ("2:0", "2", "aa", 95)]),
+        # The same output spent twice
+        (["0:0", "0:0"], [("2:0", "2", "bb", 5), ("2:1", "2", "aa", 195)]),
+        # An unknown input after a known one
+        (["0:0", "9:0"], [("2:0", "2", "bb", 5), ("2:1", "2", "aa", 95)]),
+    ],
+)
+def test_rejected_transactions_change_nothing(utxos, inputs, outputs):
+    before = sorted(utxos)
+
+    with pytest.raises(KeyError):
+        utxos.apply(transaction("2", inputs, outputs))
+
+    assert sorted(utxos) == before
+    assert utxos.balance("aa") == 100 and utxos.balance("bb") == 200